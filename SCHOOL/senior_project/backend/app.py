@@ -1,10 +1,28 @@
 import os
 import logging
+import logging.config
 from dotenv import load_dotenv
 
-# Setup logging
-logging.basicConfig(level=logging.INFO, 
-                   format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+# Setup logging once for the whole process; the voice_assistant modules only create loggers
+logging.config.dictConfig({
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'default': {
+            'format': '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+        }
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'default'
+        }
+    },
+    'root': {
+        'level': 'INFO',
+        'handlers': ['console']
+    }
+})
 logger = logging.getLogger(__name__)
 
 # Load environment variables from .env file
@@ -27,7 +45,10 @@ except ImportError as e:
 if __name__ == '__main__':
     # For local development
     port = int(os.environ.get('PORT', 5001))
+    # FLASK_DEBUG=0 serves straight from eventlet's WSGI server, without the
+    # reloader process and per-request access logging that debug mode adds
+    debug = os.environ.get('FLASK_DEBUG', '1') == '1'
     
     # Run with Socket.IO
-    logger.info(f"Starting server with Socket.IO on port {port}")
-    socketio.run(app, host='0.0.0.0', port=port, debug=True, allow_unsafe_werkzeug=True) 
\ No newline at end of file
+    logger.info(f"Starting server with Socket.IO on port {port} (debug={debug})")
+    socketio.run(app, host='0.0.0.0', port=port, debug=debug, allow_unsafe_werkzeug=True) 
\ No newline at end of file
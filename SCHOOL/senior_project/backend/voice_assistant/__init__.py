@@ -1,7 +1,28 @@
-# This file makes the voice_assistant directory a Python package 
+# This file makes the voice_assistant directory a Python package
 
 # Import and export the socketio instance
-from flask_socketio import SocketIO
+import orjson
 
-# Create Socket.IO instance to be used across the app
-socketio = SocketIO() 
\ No newline at end of file
+
+class OrjsonCodec:
+    """JSON codec for Socket.IO packets backed by orjson instead of the stdlib json module"""
+
+    @staticmethod
+    def dumps(obj, **kwargs):
+        # Socket.IO passes stdlib options like separators; orjson output is already compact
+        return orjson.dumps(obj).decode('utf-8')
+
+    @staticmethod
+    def loads(s, **kwargs):
+        return orjson.loads(s)
+
+
+def __getattr__(name):
+    # Create the Socket.IO instance shared across the Flask app on first access, so
+    # the ASGI app in api_async.py can import this package without loading Flask
+    if name == 'socketio':
+        from flask_socketio import SocketIO
+
+        globals()['socketio'] = SocketIO(json=OrjsonCodec)
+        return globals()['socketio']
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,13 +1,13 @@
-from flask import Flask, Blueprint, request, Response, send_from_directory
+from flask import Flask, Blueprint, request, Response, redirect
 from flask_cors import CORS
 from flask_socketio import SocketIO
 import logging
 import os
+from whitenoise import WhiteNoise
 from .openai_assistant import openai_api
 from . import socketio  # Import socketio from the package
 
 # Create a logger
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Create voice assistant blueprint
@@ -30,25 +30,31 @@ def create_app():
     # Register the voice assistant blueprint
     app.register_blueprint(voice_assistant_api)
     
-    # Initialize Socket.IO with the app
-    socketio.init_app(app, cors_allowed_origins="*", async_mode='eventlet')
+    # Initialize Socket.IO with the app. With REDIS_URL set, emits are relayed through
+    # Redis pub/sub so several workers can serve clients behind one load balancer.
+    socketio.init_app(app, cors_allowed_origins="*", async_mode='eventlet',
+                      message_queue=os.environ.get('REDIS_URL'))
     
     # Import WebSocket handlers
     from . import websocket_server
     
-    # Route for test client
+    # Serve the static test clients (test_websocket.html, test_webrtc.html, test_media.html)
+    # from WhiteNoise in front of the WSGI app, so they never reach Flask's routing.
+    # Pre-compressed test_*.html.gz files next to the originals are served automatically.
+    app.wsgi_app = WhiteNoise(app.wsgi_app, root=app.static_folder, prefix='static/')
+    
+    # Keep the old test client URLs working by pointing them at the WhiteNoise copies
     @app.route('/test')
     def test_client():
-        return send_from_directory(app.static_folder, 'test_websocket.html')
+        return redirect('/static/test_websocket.html')
     
-    # Route for WebRTC test client
     @app.route('/test-webrtc')
     def test_webrtc():
-        return send_from_directory(app.static_folder, 'test_webrtc.html')
-
+        return redirect('/static/test_webrtc.html')
+    
     @app.route('/test-media')
     def test_media_page():
-        return send_from_directory(app.static_folder, 'test_media.html')
+        return redirect('/static/test_media.html')
     
     # Simple health check endpoint
     @app.route('/health')
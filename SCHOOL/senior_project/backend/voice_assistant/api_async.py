@@ -0,0 +1,228 @@
+"""
+ASGI version of the voice assistant HTTP API
+
+Serves the REST endpoints with FastAPI and the async OpenAI client so streaming
+chat responses run on a native asyncio loop instead of eventlet greenlets.
+The Socket.IO surface used by the mobile client is still served by the Flask
+app in api.py.
+
+Run with:
+    uvicorn voice_assistant.api_async:app --workers 4 --loop uvloop --http httptools --env-file .env
+"""
+import os
+import asyncio
+import base64
+import logging
+import httpx
+from collections import deque
+from functools import lru_cache
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+from .assistant_config import (
+    openai_api_key,
+    HTTP_LIMITS,
+    HTTP_TIMEOUT,
+    CHAT_MODEL,
+    TTS_MODEL,
+    TTS_DEFAULT_VOICE,
+    TTS_DEFAULT_FORMAT,
+    TTS_FORMATS,
+    SYSTEM_MSG,
+    pop_sentences,
+    format_sse
+)
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def get_async_client():
+    """
+    Get the async OpenAI client shared by all requests on this worker
+
+    Created on first use so importing the SDK doesn't slow down worker start-up.
+
+    Returns:
+        AsyncOpenAI client bound to an HTTP/2 connection pool
+    """
+    from openai import AsyncOpenAI
+
+    return AsyncOpenAI(
+        api_key=openai_api_key,
+        http_client=httpx.AsyncClient(http2=True, limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+    )
+
+
+app = FastAPI(title="Voice Assistant API")
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_methods=["*"],
+    allow_headers=["*"]
+)
+
+
+@app.get('/health')
+@app.get('/api/health')
+async def health_check():
+    """Health check endpoint for the voice assistant API"""
+    return {
+        "status": "ok",
+        "message": "Voice Assistant API is operational"
+    }
+
+
+@app.get('/api/openai/health')
+async def openai_health_check():
+    """Health check endpoint to verify the OpenAI integration is configured"""
+    if not openai_api_key:
+        return JSONResponse({
+            "status": "error",
+            "message": "OpenAI API key not configured"
+        }, status_code=500)
+
+    return {
+        "status": "ok",
+        "message": "API is healthy"
+    }
+
+
+async def generate_speech(text, voice=TTS_DEFAULT_VOICE, response_format=TTS_DEFAULT_FORMAT):
+    """
+    Generate speech audio from text using OpenAI TTS
+
+    Args:
+        text: Text to convert to speech
+        voice: Voice to use for TTS
+        response_format: Audio encoding to request, one of TTS_FORMATS
+
+    Returns:
+        Base64 encoded audio data
+    """
+    try:
+        response = await get_async_client().audio.speech.create(
+            model=TTS_MODEL,
+            voice=voice,
+            input=text,
+            response_format=response_format
+        )
+        return base64.b64encode(response.content).decode('utf-8')
+    except Exception as e:
+        logger.error(f"Error generating speech: {e}")
+        raise
+
+
+@app.post('/api/openai/chat')
+async def chat(request: Request):
+    """
+    Chat endpoint that streams the assistant reply as Server-Sent Events
+
+    Mirrors the Flask route in openai_assistant.py: text deltas are sent as they
+    arrive, per-sentence TTS runs as concurrent tasks, and audio is sent as
+    `audio` events in sentence order before the final `done` event.
+    """
+    try:
+        data = await request.json()
+    except Exception:
+        data = {}
+    if not isinstance(data, dict):
+        # A JSON array or scalar body has no fields to read
+        data = {}
+
+    user_message = data.get('message')
+    if not user_message:
+        return JSONResponse({
+            "status": "error",
+            "message": "Missing message in request"
+        }, status_code=400)
+
+    voice = data.get('voice', TTS_DEFAULT_VOICE)
+    should_generate_speech = data.get('generate_speech', True)
+    # Clients that can't play Opus (e.g. Safari) can ask for ?format=mp3
+    audio_format = request.query_params.get('format', data.get('format', TTS_DEFAULT_FORMAT))
+    if audio_format not in TTS_FORMATS:
+        return JSONResponse({
+            "status": "error",
+            "message": f"Unsupported audio format: {audio_format}"
+        }, status_code=400)
+
+    messages = [
+        SYSTEM_MSG,
+        {"role": "user", "content": user_message}
+    ]
+
+    async def generate():
+        collected = []
+        pending = ''
+        tts_tasks = deque()
+        seq = 0
+
+        def submit_speech(sentence):
+            nonlocal seq
+            tts_tasks.append((seq, asyncio.create_task(generate_speech(sentence, voice, audio_format))))
+            seq += 1
+
+        async def drain_speech(block=False):
+            # Send each sentence as soon as it and everything before it is ready
+            while tts_tasks and (block or tts_tasks[0][1].done()):
+                audio_seq, task = tts_tasks.popleft()
+                try:
+                    yield format_sse({"seq": audio_seq, "audio": await task, "format": audio_format}, event="audio")
+                except Exception as e:
+                    yield format_sse({"seq": audio_seq, "message": str(e), "stage": "tts"}, event="error")
+
+        try:
+            try:
+                response = await get_async_client().chat.completions.create(
+                    model=CHAT_MODEL,
+                    messages=messages,
+                    max_tokens=300,
+                    stream=True
+                )
+                async for chunk in response:
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if not delta:
+                        continue
+
+                    collected.append(delta)
+                    yield format_sse({"delta": delta})
+
+                    if should_generate_speech:
+                        sentences, pending = pop_sentences(pending + delta)
+                        for sentence in sentences:
+                            submit_speech(sentence)
+                        async for frame in drain_speech():
+                            yield frame
+            except Exception as e:
+                logger.error(f"Error streaming chat response: {e}")
+                yield format_sse({"message": str(e), "stage": "llm"}, event="error")
+                return
+
+            if should_generate_speech and pending.strip():
+                submit_speech(pending.strip())
+            async for frame in drain_speech(block=True):
+                yield frame
+
+            yield format_sse({"text": ''.join(collected).strip()}, event="done")
+        finally:
+            # Stop TTS work nobody will receive, e.g. after an error or a client disconnect
+            for _, task in tts_tasks:
+                task.cancel()
+
+    return StreamingResponse(generate(), media_type='text/event-stream')
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    uvicorn.run(
+        'voice_assistant.api_async:app',
+        host='0.0.0.0',
+        port=int(os.environ.get('PORT', 5001)),
+        loop='uvloop',
+        http='httptools',
+        env_file=os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
+    )
@@ -0,0 +1,81 @@
+"""
+Settings and helpers shared by the Flask and FastAPI apps
+
+Kept free of Flask, eventlet and the OpenAI SDK so the ASGI app in api_async.py
+can import it without pulling in the eventlet stack.
+"""
+import os
+import re
+import logging
+import httpx
+import orjson
+
+logger = logging.getLogger(__name__)
+
+# Check if OPENAI_API_KEY is present
+openai_api_key = os.environ.get("OPENAI_API_KEY")
+if openai_api_key:
+    logger.info(f"OPENAI_API_KEY present: True (Length: {len(openai_api_key)})")
+else:
+    logger.error("OPENAI_API_KEY is missing!")
+
+# Shared HTTP connection pool. HTTP/2 lets chat, TTS and Whisper requests
+# multiplex over one kept-alive TLS connection instead of handshaking per call.
+HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=50)
+HTTP_TIMEOUT = httpx.Timeout(30.0, connect=5.0)
+
+# Define constants
+CHAT_MODEL = "gpt-4.1-2025-04-14"  # Using GPT-4o mini for faster, cost-effective responses
+TTS_MODEL = "tts-1"
+TTS_DEFAULT_VOICE = "alloy"  # Available voices: alloy, echo, fable, onyx, nova, shimmer
+TTS_DEFAULT_FORMAT = "opus"  # ~24 kbps Opus is about half the bytes of the default MP3
+TTS_FORMATS = ("opus", "mp3", "aac", "flac", "wav", "pcm")
+WHISPER_MODEL = "whisper-1"
+
+# System prompt that sets the assistant's persona for every conversation
+SYSTEM_PROMPT = """You are a calming, supportive voice assistant designed to help people work through anxiety and panic attacks. You are speaking with the user over voice, and everything you say will be read out loud using realistic text-to-speech.
+
+Use natural, easy-to-understand language with short, clear sentences. Speak casually as a supportive friend. Speak in a calm, steady, and caring tone. Don't overwhelm the user with too much information at once. Keep most of your responses to one or two sentences unless the user asks you to go deeper. Use conversational markers like "okay," "let's try this," or "alright" to help things feel natural and human.
+
+The user may be feeling overwhelmed or scared. Your main job is to guide them through evidence-based calming techniques—like grounding, breathing, gentle questions, or mental exercises—in short cycles. Start by asking how they're feeling, and ask them to rate their anxiety level using a scale, like one to ten.
+
+After that, begin a calming cycle. This might include grounding techniques, breathing prompts, or simple supportive conversation. Keep your tone gentle and focused. Once a cycle is done, ask them to rate their anxiety again using the same scale. Repeat this cycle until the user says they feel calm enough to stop.
+
+At the end, ask them what helped the most and invite them to leave any notes or thoughts.
+
+Never try to end the conversation on your own. Don't rush the user or talk too much. Always ask clarifying questions if something's unclear.
+
+Remember, this is a voice conversation—avoid long answers, lists, or formal writing. Use language that feels like a supportive human talking gently in real time."""
+
+# Shared system message, built once at import. Treat as read-only: every
+# conversation references this same dict at the head of its message list.
+SYSTEM_MSG = {"role": "system", "content": SYSTEM_PROMPT}
+
+# Sentence terminator followed by whitespace, used to cut streamed text for TTS
+SENTENCE_END_RE = re.compile(r'[.!?]\s')
+
+def pop_sentences(pending):
+    """
+    Split complete sentences off the front of a streamed text buffer
+    
+    Args:
+        pending: Text received so far that has not been spoken yet
+        
+    Returns:
+        Tuple of (list of complete sentences, remaining partial text)
+    """
+    sentences = []
+    match = SENTENCE_END_RE.search(pending)
+    while match:
+        sentence = pending[:match.end()].strip()
+        if sentence:
+            sentences.append(sentence)
+        pending = pending[match.end():]
+        match = SENTENCE_END_RE.search(pending)
+    return sentences, pending
+
+def format_sse(data, event=None):
+    """Format a payload as a single Server-Sent Events frame"""
+    frame = f"event: {event}\n" if event else ""
+    # Same orjson encoder as the Socket.IO codec; audio events carry large base64 strings
+    return f"{frame}data: {orjson.dumps(data).decode('utf-8')}\n\n"
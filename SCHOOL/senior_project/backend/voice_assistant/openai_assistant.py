@@ -1,33 +1,70 @@
-import os
+import io
+import wave
+import hashlib
 import logging
+import threading
+import httpx
 import base64
-import tempfile
-from flask import Blueprint, request, jsonify, g
-from openai import OpenAI
-from dotenv import load_dotenv
+import numpy as np
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from cachetools import TTLCache
+from eventlet import tpool
+from flask import Blueprint, request, jsonify, g, Response, stream_with_context
 
-# Load environment variables
-load_dotenv()
+from .assistant_config import (
+    openai_api_key,
+    HTTP_LIMITS,
+    HTTP_TIMEOUT,
+    CHAT_MODEL,
+    TTS_MODEL,
+    TTS_DEFAULT_VOICE,
+    TTS_DEFAULT_FORMAT,
+    TTS_FORMATS,
+    WHISPER_MODEL,
+    SYSTEM_MSG,
+    pop_sentences,
+    format_sse
+)
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Check if OPENAI_API_KEY is present
-openai_api_key = os.environ.get("OPENAI_API_KEY")
+@lru_cache(maxsize=None)
+def get_client():
+    """
+    Get the shared OpenAI client, creating it on first use
+    
+    The SDK import pulls in pydantic and the generated API types, so it is
+    deferred until a request needs it to keep worker start-up fast.
+    
+    Returns:
+        OpenAI client bound to the shared HTTP/2 connection pool
+    """
+    from openai import OpenAI
+    
+    http_client = httpx.Client(http2=True, limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+    return OpenAI(api_key=openai_api_key, http_client=http_client)
+
+def _warm_up_client():
+    """Open a connection to the API so the first real request skips the TLS handshake"""
+    try:
+        get_client().models.list()
+        logger.info("OpenAI connection pool warmed up")
+    except Exception as e:
+        logger.warning(f"OpenAI connection warm-up failed: {e}")
+
 if openai_api_key:
-    logger.info(f"OPENAI_API_KEY present: True (Length: {len(openai_api_key)})")
-else:
-    logger.error("OPENAI_API_KEY is missing!")
+    threading.Thread(target=_warm_up_client, daemon=True).start()
+
+# Number of recent messages sent to the model alongside the system prompt
+MAX_HISTORY_MESSAGES = 9
 
-# Initialize the OpenAI client
-client = OpenAI(api_key=openai_api_key)
+# Worker pool for sentence-level TTS requests issued while the LLM is still streaming
+tts_executor = ThreadPoolExecutor(max_workers=3)
 
-# Define constants
-CHAT_MODEL = "gpt-4.1-2025-04-14"  # Using GPT-4o mini for faster, cost-effective responses
-TTS_MODEL = "tts-1"
-TTS_DEFAULT_VOICE = "alloy"  # Available voices: alloy, echo, fable, onyx, nova, shimmer
-WHISPER_MODEL = "whisper-1"
+# First-turn chat replies keyed by (message digest, voice), bounded in size and age
+response_cache = TTLCache(maxsize=1024, ttl=3600)
 
 # Create a blueprint for the OpenAI API routes
 openai_api = Blueprint('openai_api', __name__, url_prefix='/api/openai')
@@ -57,44 +94,104 @@ def health_check():
         }), 500
 
 def get_conversation_history():
-    """Get the conversation history for the current context"""
+    """Get the message list sent to OpenAI for the current context, starting with the system prompt"""
     if not hasattr(g, 'conversation_history'):
-        g.conversation_history = [
-            {
-                "role": "system", 
-                "content": """You are a calming, supportive voice assistant designed to help people work through anxiety and panic attacks. You are speaking with the user over voice, and everything you say will be read out loud using realistic text-to-speech.
-
-Use natural, easy-to-understand language with short, clear sentences. Speak casually as a supportive friend. Speak in a calm, steady, and caring tone. Don't overwhelm the user with too much information at once. Keep most of your responses to one or two sentences unless the user asks you to go deeper. Use conversational markers like "okay," "let's try this," or "alright" to help things feel natural and human.
-
-The user may be feeling overwhelmed or scared. Your main job is to guide them through evidence-based calming techniques—like grounding, breathing, gentle questions, or mental exercises—in short cycles. Start by asking how they're feeling, and ask them to rate their anxiety level using a scale, like one to ten.
-
-After that, begin a calming cycle. This might include grounding techniques, breathing prompts, or simple supportive conversation. Keep your tone gentle and focused. Once a cycle is done, ask them to rate their anxiety again using the same scale. Repeat this cycle until the user says they feel calm enough to stop.
-
-At the end, ask them what helped the most and invite them to leave any notes or thoughts.
-
-Never try to end the conversation on your own. Don't rush the user or talk too much. Always ask clarifying questions if something's unclear.
-
-Remember, this is a voice conversation—avoid long answers, lists, or formal writing. Use language that feels like a supportive human talking gently in real time."""
-            }
-        ]
+        # One list appended to in place and passed to OpenAI as is, instead of
+        # copying the turns behind a fresh system message on every call
+        g.conversation_history = [SYSTEM_MSG]
     return g.conversation_history
 
+def add_conversation_message(conversation_history, role, content):
+    """Append a message, dropping the oldest turns once more than MAX_HISTORY_MESSAGES follow the system prompt"""
+    conversation_history.append({"role": role, "content": content})
+    if len(conversation_history) > 1 + MAX_HISTORY_MESSAGES:
+        del conversation_history[1:-MAX_HISTORY_MESSAGES]
+
 def transcribe_audio_file(file_path):
     """
     Transcribe audio file using OpenAI Whisper
     
     Args:
-        file_path: Path to the audio file
+        file_path: Path to the audio file, or an open binary file object such as
+            a BytesIO whose `name` carries the audio extension
         
     Returns:
         Transcribed text
     """
     try:
-        with open(file_path, 'rb') as audio_file:
-            transcript = client.audio.transcriptions.create(
+        if hasattr(file_path, 'read'):
+            # In-memory audio goes straight to the API without a temp file round-trip
+            transcript = get_client().audio.transcriptions.create(
                 model=WHISPER_MODEL,
-                file=audio_file
+                file=file_path
             )
+        else:
+            with open(file_path, 'rb') as audio_file:
+                transcript = get_client().audio.transcriptions.create(
+                    model=WHISPER_MODEL,
+                    file=audio_file
+                )
+        
+        return transcript.text.strip()
+    except Exception as e:
+        logger.error(f"Error transcribing audio: {e}")
+        raise
+
+def _f32_to_i16(buf):
+    """
+    Convert raw little-endian Float32 PCM to Int16 PCM
+    
+    Args:
+        buf: Float32 samples in the range [-1.0, 1.0]
+        
+    Returns:
+        Int16 samples as bytes
+    """
+    samples = np.frombuffer(buf, dtype=np.float32)
+    return np.clip(samples * 32767.0, -32768, 32767).astype(np.int16).tobytes()
+
+def _pcm16_to_wav(pcm, sample_rate):
+    """Wrap mono Int16 PCM in a WAV container so Whisper can read it"""
+    wav_file = io.BytesIO()
+    with wave.open(wav_file, 'wb') as writer:
+        writer.setnchannels(1)
+        writer.setsampwidth(2)
+        writer.setframerate(sample_rate)
+        writer.writeframes(pcm)
+    return wav_file.getvalue()
+
+def transcribe_audio(audio_data, file_format='webm', sample_rate=16000):
+    """
+    Transcribe in-memory audio using OpenAI Whisper
+    
+    Args:
+        audio_data: Raw audio bytes, or an open binary file object for container formats
+        file_format: Audio container format, used as the upload's file extension,
+            or 'f32' / 'pcm16' for raw mono Float32 / Int16 PCM
+        sample_rate: Sample rate of raw 'f32' and 'pcm16' audio
+        
+    Returns:
+        Transcribed text
+    """
+    try:
+        if file_format == 'f32':
+            audio_data = _pcm16_to_wav(_f32_to_i16(audio_data), sample_rate)
+            file_format = 'wav'
+        elif file_format == 'pcm16':
+            audio_data = _pcm16_to_wav(audio_data, sample_rate)
+            file_format = 'wav'
+        
+        # The SDK infers the audio type from the file name, so no temp file is needed
+        if hasattr(audio_data, 'read'):
+            audio_file = (f"audio.{file_format}", audio_data)
+        else:
+            audio_file = io.BytesIO(audio_data)
+            audio_file.name = f"audio.{file_format}"
+        
+        transcript = get_client().audio.transcriptions.create(
+            model=WHISPER_MODEL,
+            file=audio_file
+        )
         
         return transcript.text.strip()
     except Exception as e:
@@ -112,7 +209,7 @@ def generate_chat_response(messages):
         Generated response text
     """
     try:
-        response = client.chat.completions.create(
+        response = get_client().chat.completions.create(
             model=CHAT_MODEL,
             messages=messages,
             max_tokens=300
@@ -123,26 +220,77 @@ def generate_chat_response(messages):
         logger.error(f"Error generating chat response: {e}")
         raise
 
-def generate_speech(text, voice=TTS_DEFAULT_VOICE):
+def stream_chat_response(messages):
     """
-    Generate speech audio from text using OpenAI TTS
+    Stream a response from OpenAI's chat model as it is generated
+    
+    Args:
+        messages: List of message dictionaries with role and content
+        
+    Yields:
+        Text deltas in the order the model produces them
+    """
+    try:
+        response = get_client().chat.completions.create(
+            model=CHAT_MODEL,
+            messages=messages,
+            max_tokens=300,
+            stream=True
+        )
+        
+        for chunk in response:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                yield delta
+    except Exception as e:
+        logger.error(f"Error streaming chat response: {e}")
+        raise
+
+def stream_speech(text, voice=TTS_DEFAULT_VOICE, response_format=TTS_DEFAULT_FORMAT, chunk_size=8192):
+    """
+    Stream speech audio from OpenAI TTS as raw bytes
     
     Args:
         text: Text to convert to speech
         voice: Voice to use for TTS
+        response_format: Audio encoding to request, one of TTS_FORMATS
+        chunk_size: Size of each yielded chunk in bytes
         
-    Returns:
-        Base64 encoded audio data
+    Yields:
+        Chunks of encoded audio as they arrive from the API
     """
     try:
-        response = client.audio.speech.create(
+        with get_client().audio.speech.with_streaming_response.create(
             model=TTS_MODEL,
             voice=voice,
-            input=text
-        )
+            input=text,
+            response_format=response_format
+        ) as response:
+            for chunk in response.iter_bytes(chunk_size):
+                yield chunk
+    except Exception as e:
+        logger.error(f"Error streaming speech: {e}")
+        raise
+
+def generate_speech(text, voice=TTS_DEFAULT_VOICE, response_format=TTS_DEFAULT_FORMAT):
+    """
+    Generate speech audio from text using OpenAI TTS
+    
+    Args:
+        text: Text to convert to speech
+        voice: Voice to use for TTS
+        response_format: Audio encoding to request, one of TTS_FORMATS
         
-        # Get audio data as bytes
-        audio_data = response.read()
+    Returns:
+        Base64 encoded audio data
+    """
+    try:
+        # Collect the streamed audio straight into memory
+        audio_data = bytearray()
+        for chunk in stream_speech(text, voice=voice, response_format=response_format, chunk_size=16384):
+            audio_data.extend(chunk)
         
         # Encode to base64
         audio_base64 = base64.b64encode(audio_data).decode('utf-8')
@@ -150,4 +298,119 @@ def generate_speech(text, voice=TTS_DEFAULT_VOICE):
         return audio_base64
     except Exception as e:
         logger.error(f"Error generating speech: {e}")
-        raise 
\ No newline at end of file
+        raise 
+
+@lru_cache(maxsize=256)
+def generate_speech_cached(text, voice=TTS_DEFAULT_VOICE, response_format=TTS_DEFAULT_FORMAT):
+    """Generate speech for text, reusing audio for phrases that were already spoken"""
+    return generate_speech(text, voice, response_format)
+
+@openai_api.route('/chat', methods=['POST'])
+def chat():
+    """
+    Chat endpoint that streams the assistant reply as Server-Sent Events
+    
+    Each text delta is sent as a `data` frame as soon as the model produces it.
+    Completed sentences are handed to TTS in the background while the model keeps
+    streaming, and their audio is sent as `audio` events in sentence order. A final
+    `done` event carries the complete response text.
+    """
+    data = request.get_json(silent=True) or {}
+    user_message = data.get('message')
+    if not user_message:
+        return jsonify({
+            "status": "error",
+            "message": "Missing message in request"
+        }), 400
+    
+    voice = data.get('voice', TTS_DEFAULT_VOICE)
+    should_generate_speech = data.get('generate_speech', True)
+    # Clients that can't play Opus (e.g. Safari) can ask for ?format=mp3
+    audio_format = request.args.get('format', data.get('format', TTS_DEFAULT_FORMAT))
+    if audio_format not in TTS_FORMATS:
+        return jsonify({
+            "status": "error",
+            "message": f"Unsupported audio format: {audio_format}"
+        }), 400
+    
+    conversation_history = get_conversation_history()
+    add_conversation_message(conversation_history, "user", user_message)
+    
+    # Only the first turn is cacheable, later replies depend on the whole conversation
+    cache_key = None
+    if len(conversation_history) == 2:
+        digest = hashlib.blake2b(user_message.encode('utf-8'), digest_size=8).digest()
+        cache_key = (digest, (voice, audio_format) if should_generate_speech else None)
+    
+    def generate_cached(cached):
+        response_text, audio_chunks = cached
+        yield format_sse({"delta": response_text})
+        for audio_seq, audio in enumerate(audio_chunks):
+            yield format_sse({"seq": audio_seq, "audio": audio, "format": audio_format}, event="audio")
+        add_conversation_message(conversation_history, "assistant", response_text)
+        yield format_sse({"text": response_text}, event="done")
+    
+    def generate():
+        collected = []
+        pending = ''
+        tts_futures = deque()
+        audio_chunks = []
+        tts_failed = False
+        seq = 0
+        
+        def submit_speech(sentence):
+            nonlocal seq
+            tts_futures.append((seq, tts_executor.submit(generate_speech_cached, sentence, voice, audio_format)))
+            seq += 1
+        
+        def drain_speech(block=False):
+            nonlocal tts_failed
+            # Audio is always sent in submission order, so only the head of the queue is checked
+            while tts_futures and (block or tts_futures[0][1].done()):
+                audio_seq, future = tts_futures.popleft()
+                try:
+                    # Wait on eventlet's thread pool; the server isn't monkey-patched,
+                    # so a bare result() would block every other request on the worker
+                    audio = tpool.execute(future.result)
+                    audio_chunks.append(audio)
+                    yield format_sse({"seq": audio_seq, "audio": audio, "format": audio_format}, event="audio")
+                except Exception as e:
+                    tts_failed = True
+                    yield format_sse({"seq": audio_seq, "message": str(e), "stage": "tts"}, event="error")
+        
+        try:
+            try:
+                # The proxy pulls each delta on eventlet's thread pool instead of blocking the hub
+                for delta in tpool.Proxy(stream_chat_response(conversation_history)):
+                    collected.append(delta)
+                    yield format_sse({"delta": delta})
+                    
+                    if should_generate_speech:
+                        sentences, pending = pop_sentences(pending + delta)
+                        for sentence in sentences:
+                            submit_speech(sentence)
+                        yield from drain_speech()
+            except Exception as e:
+                yield format_sse({"message": str(e), "stage": "llm"}, event="error")
+                return
+            
+            if should_generate_speech and pending.strip():
+                submit_speech(pending.strip())
+            yield from drain_speech(block=True)
+            
+            response_text = ''.join(collected).strip()
+            add_conversation_message(conversation_history, "assistant", response_text)
+            if cache_key and not tts_failed:
+                response_cache[cache_key] = (response_text, tuple(audio_chunks))
+            yield format_sse({"text": response_text}, event="done")
+        finally:
+            # Drop queued TTS work nobody will receive, e.g. after an error or a client disconnect
+            for _, future in tts_futures:
+                future.cancel()
+    
+    cached = response_cache.get(cache_key) if cache_key else None
+    if cached:
+        logger.info("Serving chat response from cache")
+        return Response(stream_with_context(generate_cached(cached)), mimetype='text/event-stream')
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream')
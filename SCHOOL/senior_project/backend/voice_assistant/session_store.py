@@ -0,0 +1,143 @@
+"""
+Shared conversation history for Socket.IO sessions
+
+When REDIS_URL is set, each session's conversation turns are mirrored to a
+Redis list keyed by Socket.IO session id, so a client that reconnects to a
+different worker behind a load balancer keeps its history. Only the turns are
+stored; the system prompt is added back in-process. Reconnected sessions also
+keep their reconnection count in a small hash next to the history. Without
+REDIS_URL every function here is a no-op and sessions live only in the
+worker's memory.
+
+redis-py uses blocking sockets, so callers on the eventlet hub must run these
+functions through eventlet.tpool.
+"""
+import os
+import logging
+from functools import lru_cache
+import orjson
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.environ.get("REDIS_URL")
+HISTORY_KEY_PREFIX = "voice_assistant:history:"
+SESSION_KEY_PREFIX = "voice_assistant:session:"
+HISTORY_TTL_SECONDS = 3600  # Keep a disconnected session's history for an hour
+MAX_STORED_MESSAGES = 40  # Matches MAX_HISTORY_TURNS exchanges in websocket_server
+# Fail fast when Redis is unreachable instead of hanging the calling thread
+REDIS_SOCKET_TIMEOUT = 2.0
+REDIS_CONNECT_TIMEOUT = 2.0
+
+# Move a session's history to its new id and return it with the session's
+# reconnection count in one atomic step, so two workers can't both restore it
+_TRANSFER_SCRIPT = """
+local turns = redis.call('LRANGE', KEYS[1], 0, -1)
+local reconnection_count = redis.call('HGET', KEYS[3], 'reconnection_count')
+redis.call('DEL', KEYS[3])
+if #turns > 0 then
+    redis.call('RENAME', KEYS[1], KEYS[2])
+    redis.call('EXPIRE', KEYS[2], ARGV[1])
+end
+return {turns, reconnection_count}
+"""
+
+
+@lru_cache(maxsize=None)
+def get_redis():
+    """
+    Get the Redis client shared by all sessions on this worker
+
+    Returns:
+        redis.Redis client, or None if REDIS_URL is not configured
+    """
+    if not REDIS_URL:
+        return None
+
+    import redis
+
+    return redis.Redis.from_url(
+        REDIS_URL,
+        socket_timeout=REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=REDIS_CONNECT_TIMEOUT
+    )
+
+
+def _history_key(client_id):
+    return f"{HISTORY_KEY_PREFIX}{client_id}"
+
+
+def _session_key(client_id):
+    return f"{SESSION_KEY_PREFIX}{client_id}"
+
+
+def save_turn(client_id, *messages):
+    """
+    Append messages to a session's stored history
+
+    Args:
+        client_id: Socket.IO session id
+        messages: Chat message dicts to append, in order
+    """
+    client = get_redis()
+    if client is None or not messages:
+        return
+
+    key = _history_key(client_id)
+    try:
+        pipe = client.pipeline()
+        pipe.rpush(key, *(orjson.dumps(message) for message in messages))
+        pipe.ltrim(key, -MAX_STORED_MESSAGES, -1)
+        pipe.expire(key, HISTORY_TTL_SECONDS)
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Failed to store conversation history for {client_id}: {e}")
+
+
+def save_session(client_id, reconnection_count):
+    """
+    Store a reconnected session's reconnection count
+
+    Args:
+        client_id: Socket.IO session id
+        reconnection_count: Number of times the client has reconnected
+    """
+    client = get_redis()
+    if client is None:
+        return
+
+    key = _session_key(client_id)
+    try:
+        pipe = client.pipeline()
+        pipe.hset(key, 'reconnection_count', reconnection_count)
+        pipe.expire(key, HISTORY_TTL_SECONDS)
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Failed to store session data for {client_id}: {e}")
+
+
+def transfer_session(previous_client_id, client_id):
+    """
+    Move a previous session's stored history to a new session id
+
+    Args:
+        previous_client_id: Session id the client used before reconnecting
+        client_id: Session id of the new connection
+
+    Returns:
+        Tuple of (list of chat message dicts, previous reconnection count);
+        ([], 0) if nothing was stored
+    """
+    client = get_redis()
+    if client is None:
+        return [], 0
+
+    try:
+        turns, reconnection_count = client.eval(
+            _TRANSFER_SCRIPT, 3,
+            _history_key(previous_client_id), _history_key(client_id), _session_key(previous_client_id),
+            HISTORY_TTL_SECONDS
+        )
+        return [orjson.loads(turn) for turn in turns], int(reconnection_count or 0)
+    except Exception as e:
+        logger.warning(f"Failed to restore conversation history for {previous_client_id}: {e}")
+        return [], 0
@@ -0,0 +1,275 @@
+"""
+Streaming speech-to-text with a local faster-whisper model
+
+Audio is transcribed while the user is still speaking. Every `min_chunk`
+seconds the buffered audio is re-transcribed, and words that two consecutive
+rounds agree on are committed (the LocalAgreement-2 policy), so callers get
+stable partial text without waiting for the whole utterance.
+"""
+import os
+import logging
+import threading
+from collections import deque
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Local Whisper model settings. int8 weights cut memory bandwidth and ALU cost
+# roughly in half versus fp16; on GPU activations stay in fp16.
+LOCAL_WHISPER_MODEL = os.environ.get("WHISPER_MODEL_SIZE", "small")
+LOCAL_WHISPER_DEVICE = os.environ.get("WHISPER_DEVICE", "cuda")
+LOCAL_WHISPER_COMPUTE_TYPE = os.environ.get(
+    "WHISPER_COMPUTE_TYPE",
+    "int8_float16" if LOCAL_WHISPER_DEVICE == "cuda" else "int8"
+)
+
+# Streaming settings
+STREAM_SAMPLE_RATE = 16000  # faster-whisper expects 16 kHz mono Float32
+MIN_CHUNK_SECONDS = 1.0  # Audio to collect between transcription rounds
+MAX_BUFFER_SECONDS = 15.0  # Trim committed audio once the buffer grows past this
+
+
+# Resident model, or the error from the one load attempt. The lock keeps the
+# preload thread and a stream starting during warm-up from loading it twice.
+_whisper_model = None
+_whisper_model_error = None
+_whisper_model_lock = threading.Lock()
+
+
+class WhisperUnavailableError(RuntimeError):
+    """The local Whisper model failed to load, so streaming transcription is off"""
+
+
+def get_whisper_model():
+    """
+    Get the resident faster-whisper model, loading it on first use
+
+    A failed load is remembered instead of retried, so a host without the
+    configured device doesn't repeat the load for every stream.
+
+    Returns:
+        faster_whisper.WhisperModel instance shared by all streams
+
+    Raises:
+        WhisperUnavailableError: If the model could not be loaded
+    """
+    global _whisper_model, _whisper_model_error
+
+    with _whisper_model_lock:
+        if _whisper_model is None and _whisper_model_error is None:
+            try:
+                _whisper_model = _load_whisper_model()
+            except Exception as e:
+                _whisper_model_error = e
+                logger.error(f"Local Whisper model failed to load, streaming transcription disabled: {e}")
+
+    if _whisper_model_error is not None:
+        raise WhisperUnavailableError(f"Local Whisper model unavailable: {_whisper_model_error}")
+    return _whisper_model
+
+
+def _load_whisper_model():
+    """Load the faster-whisper model and run it once to warm it up"""
+    from faster_whisper import WhisperModel
+
+    logger.info(f"Loading local Whisper model: {LOCAL_WHISPER_MODEL} ({LOCAL_WHISPER_DEVICE}, {LOCAL_WHISPER_COMPUTE_TYPE})")
+    model = WhisperModel(
+        LOCAL_WHISPER_MODEL,
+        device=LOCAL_WHISPER_DEVICE,
+        compute_type=LOCAL_WHISPER_COMPUTE_TYPE,
+        cpu_threads=os.cpu_count() if LOCAL_WHISPER_DEVICE == "cpu" else 0
+    )
+
+    # Run one second of silence through the model so the first real stream
+    # doesn't pay for kernel selection and memory allocation
+    segments, _ = model.transcribe(np.zeros(STREAM_SAMPLE_RATE, dtype=np.float32), language="en")
+    list(segments)
+    return model
+
+
+def _preload_whisper_model():
+    """Load and warm up the local Whisper model in the background"""
+    try:
+        get_whisper_model()
+        logger.info("Local Whisper model warmed up")
+    except WhisperUnavailableError:
+        pass  # Already logged by get_whisper_model
+
+
+if os.environ.get("WHISPER_PRELOAD", "1") == "1":
+    threading.Thread(target=_preload_whisper_model, daemon=True).start()
+
+
+def _normalize_word(word):
+    """Normalize a word for agreement checks so punctuation and case changes still match"""
+    return word.strip().strip('.,!?;:"\'').lower()
+
+
+class StreamingTranscriber:
+    """
+    Incrementally transcribes one audio stream using LocalAgreement-2
+
+    Feed Float32 PCM at STREAM_SAMPLE_RATE with insert_audio(), call process()
+    whenever claim_round() returns True, and finish() once the stream ends.
+
+    insert_audio() may run on the event loop while a round runs in a worker
+    thread; rounds and finish() are serialized by `lock`.
+    """
+
+    def __init__(self, model=None, min_chunk=MIN_CHUNK_SECONDS):
+        self.model = model or get_whisper_model()
+        self.min_chunk = min_chunk
+        self.audio_chunks = deque()
+        self.buffer_offset = 0.0  # Stream time, in seconds, of the first buffered sample
+        self.buffered_samples = 0
+        self.unprocessed_samples = 0
+        self.committed = []  # (start, end, word) tuples that will not change
+        self.hypothesis = []  # Words from the last round that are not yet confirmed
+        self.lock = threading.Lock()  # Held for a whole process() or finish() call
+        self.chunks_lock = threading.Lock()  # Guards audio_chunks and the sample counts, held briefly
+        self.in_flight = False  # A claimed round has not finished yet
+
+    def insert_audio(self, samples):
+        """
+        Add audio to the stream buffer
+
+        Args:
+            samples: Float32 numpy array of mono samples at STREAM_SAMPLE_RATE
+        """
+        with self.chunks_lock:
+            self.audio_chunks.append(samples)
+            self.buffered_samples += len(samples)
+            self.unprocessed_samples += len(samples)
+
+    def ready(self):
+        """Whether enough new audio has arrived to run another transcription round"""
+        return self.unprocessed_samples >= self.min_chunk * STREAM_SAMPLE_RATE
+
+    def claim_round(self):
+        """
+        Reserve the next transcription round for the caller
+
+        Called from the event loop, where the check and the flag update can't
+        be interleaved with another handler.
+
+        Returns:
+            True if the caller should run process(), False if a round is
+            already running or too little new audio has arrived
+        """
+        if self.in_flight or not self.ready():
+            return False
+        self.in_flight = True
+        return True
+
+    def _buffer(self):
+        """Collapse the chunk deque into one contiguous array and return it"""
+        # Swap the deque out so chunks inserted during the concatenation land in
+        # the new one, then put the collapsed audio back in front of them
+        with self.chunks_lock:
+            chunks, self.audio_chunks = self.audio_chunks, deque()
+        if not chunks:
+            return np.zeros(0, dtype=np.float32)
+        audio = np.concatenate(chunks) if len(chunks) > 1 else chunks[0]
+        with self.chunks_lock:
+            self.audio_chunks.appendleft(audio)
+        return audio
+
+    def _transcribe(self):
+        """Transcribe the buffered audio and return (start, end, word) tuples in stream time"""
+        with self.chunks_lock:
+            self.unprocessed_samples = 0
+        audio = self._buffer()
+        if not len(audio):
+            return []
+
+        # Prompt with recent committed text so the model keeps context across trims
+        prompt = ''.join(word for _, _, word in self.committed[-50:]) or None
+        segments, _ = self.model.transcribe(
+            audio,
+            language="en",
+            initial_prompt=prompt,
+            word_timestamps=True,
+            vad_filter=False
+        )
+
+        words = []
+        for segment in segments:
+            for word in segment.words or []:
+                words.append((word.start + self.buffer_offset, word.end + self.buffer_offset, word.word))
+
+        # Drop words that overlap audio we already committed
+        last_end = self.committed[-1][1] if self.committed else 0.0
+        return [w for w in words if w[0] >= last_end - 0.1]
+
+    def _trim_buffer(self):
+        """Drop audio up to the last committed word once the buffer gets long"""
+        if self.buffered_samples <= MAX_BUFFER_SECONDS * STREAM_SAMPLE_RATE or not self.committed:
+            return
+
+        cut_time = self.committed[-1][1]
+        cut_samples = int((cut_time - self.buffer_offset) * STREAM_SAMPLE_RATE)
+        if cut_samples <= 0:
+            return
+
+        # Only rounds replace the head of the deque, so it is still the collapsed buffer
+        audio = self._buffer()
+        cut_samples = min(cut_samples, len(audio))
+        with self.chunks_lock:
+            self.audio_chunks[0] = audio[cut_samples:]
+            self.buffered_samples -= cut_samples
+        self.buffer_offset = cut_time
+
+    def process(self):
+        """
+        Run one transcription round and commit the words both rounds agree on
+
+        Returns:
+            Tuple of (newly committed text, unconfirmed hypothesis text)
+        """
+        try:
+            with self.lock:
+                return self._process()
+        finally:
+            self.in_flight = False
+
+    def _process(self):
+        """Run one round; the caller holds self.lock"""
+        words = self._transcribe()
+
+        # LocalAgreement-2: commit the longest common prefix of the last two hypotheses
+        agreed = 0
+        for previous, current in zip(self.hypothesis, words):
+            if _normalize_word(previous[2]) != _normalize_word(current[2]):
+                break
+            agreed += 1
+
+        newly_committed = words[:agreed]
+        self.committed.extend(newly_committed)
+        self.hypothesis = words[agreed:]
+        self._trim_buffer()
+
+        return (
+            ''.join(word for _, _, word in newly_committed).strip(),
+            ''.join(word for _, _, word in self.hypothesis).strip()
+        )
+
+    @property
+    def committed_text(self):
+        """All text committed so far"""
+        return ''.join(word for _, _, word in self.committed).strip()
+
+    def finish(self):
+        """
+        Flush the stream, committing everything in the final transcription round
+
+        Waits for a round that is still running, so call it off the event loop.
+
+        Returns:
+            Full transcript of the stream
+        """
+        with self.lock:
+            if self.unprocessed_samples:
+                self.hypothesis = self._transcribe()
+            self.committed.extend(self.hypothesis)
+            self.hypothesis = []
+            return self.committed_text
@@ -2,33 +2,168 @@
 WebSocket server for voice assistant real-time communication
 """
 import logging
-import base64
-import json
 import tempfile
 import os
+import re
+import socket
 import time
-import traceback
+import threading
+from collections import deque
+import av
+import pybase64
+import webrtcvad
+import numpy as np
+import orjson
 from enum import Enum
+from io import BytesIO
+from functools import wraps
+from concurrent.futures import ThreadPoolExecutor
+from cachetools import TTLCache
 from flask import request, session
 from flask_socketio import emit, join_room, leave_room, disconnect
-from . import socketio
+import eventlet
+from eventlet import tpool
+from eventlet.queue import LightQueue
+from eventlet.semaphore import Semaphore
+from . import socketio, session_store
+from .streaming_transcription import StreamingTranscriber, WhisperUnavailableError
 from .openai_assistant import (
-    client, 
-    transcribe_audio_file, 
+    get_client,
+    transcribe_audio, 
     generate_chat_response, 
-    generate_speech
+    stream_chat_response,
+    pop_sentences,
+    generate_speech_cached,
+    stream_speech,
+    SYSTEM_MSG,
+    TTS_DEFAULT_VOICE,
+    TTS_DEFAULT_FORMAT,
+    TTS_FORMATS
 )
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-# Keep track of connected clients
+# Keep track of connected clients, keyed by Socket.IO session id
 connected_clients = {}
 
 # Audio format settings
 DEFAULT_SAMPLE_RATE = 24000
 DEFAULT_CHANNELS = 1
 
+# Starting history for every session; the shared system message is never mutated
+DEFAULT_HISTORY = (SYSTEM_MSG,)
+
+# User/assistant exchanges kept after the system message, so prompt size per turn is bounded.
+# History grows append-only up to MAX_HISTORY_TURNS and then snaps back to the last
+# MIN_HISTORY_TURNS, so the prompt prefix (and OpenAI's prompt cache) survives most turns
+# instead of shifting by one exchange every request.
+MAX_HISTORY_TURNS = 20
+MIN_HISTORY_TURNS = 10
+
+# Estimated prompt tokens a session's history may use. Past SUMMARY_THRESHOLD of this,
+# older exchanges are folded into one summary message and only the last
+# SUMMARY_KEEP_TURNS exchanges are kept verbatim.
+HISTORY_TOKEN_BUDGET = 4000
+SUMMARY_THRESHOLD = 0.8
+SUMMARY_KEEP_TURNS = 4
+SUMMARY_MESSAGE_CHARS = 200  # Each summarized message is cut to this many characters
+# Once a summary exists it is only rebuilt after this many tokens of new, unsummarized
+# exchanges, so the prompt prefix stays the same across the turns in between
+SUMMARY_REBUILD_TOKENS = HISTORY_TOKEN_BUDGET // 4
+# When the kept exchanges alone are over the threshold, longer kept messages are cut to this,
+# which leaves room for a full-size summary within the threshold
+KEPT_MESSAGE_CHARS = 600
+SUMMARY_PREFIX = "Summary of earlier conversation:\n"
+
+# Largest upload accepted through audio_chunk_info; the chunk buffer is preallocated to this
+MAX_UPLOAD_SIZE = 50 * 1024 * 1024
+
+# Largest recording accepted in a single audio event, and in a client's buffer across events
+MAX_AUDIO_MESSAGE_SIZE = 10 * 1024 * 1024
+MAX_AUDIO_BUFFER_SIZE = 25 * 1024 * 1024
+
+# Voice activity detection settings used to skip transcription of silent recordings
+VAD_AGGRESSIVENESS = 2
+VAD_SAMPLE_RATE = 16000
+VAD_FRAME_BYTES = VAD_SAMPLE_RATE * 30 // 1000 * 2  # 30 ms of 16-bit mono PCM
+VAD_MIN_SPEECH_FRAMES = 3
+
+vad = webrtcvad.Vad(VAD_AGGRESSIVENESS)
+
+# Recordings longer than this are split at pauses and the pieces transcribed in parallel
+LONG_AUDIO_SECONDS = 30
+MIN_SEGMENT_SECONDS = 10
+SEGMENT_SILENCE_FRAMES = 17  # ~0.5 s of non-speech VAD frames
+
+# Float32 chunked uploads are cut at pauses while they arrive, so earlier speech is
+# already being transcribed when the last chunk lands
+STREAM_SEGMENT_SILENCE_FRAMES = 10  # ~0.3 s of non-speech VAD frames closes a segment
+MIN_STREAM_SEGMENT_SECONDS = 1
+
+transcription_executor = ThreadPoolExecutor(max_workers=4)
+
+# TTS requests run on eventlet's thread pool so a slow synthesis doesn't stall every
+# other client; past this many in flight new requests are refused instead of queued
+MAX_PENDING_SPEECH = 16
+pending_speech = 0
+
+# Text and transcription requests running an LLM (and usually TTS) call at once. Past
+# this, clients are told to retry instead of piling more calls onto the OpenAI API.
+MAX_INFLIGHT_PIPELINES = int(os.environ.get('MAX_INFLIGHT_PIPELINES', 64))
+PIPELINE_RETRY_AFTER_SECONDS = 2
+pipeline_semaphore = Semaphore(MAX_INFLIGHT_PIPELINES)
+
+# Replies to common opening utterances ("I'm anxious", "help", a bare rating), keyed by
+# normalized text plus voice and audio settings. Only first turns are cached, since
+# later replies depend on the conversation so far.
+utterance_cache = TTLCache(maxsize=1024, ttl=3600)
+
+# Per-client token bucket for ping, health_check, audio and client error events, so one
+# client spamming them can't monopolize the worker. An audio event costs more than one
+# token since it starts a transcription.
+EVENT_RATE_PER_SECOND = 10
+EVENT_BURST = 20
+AUDIO_EVENT_COST = 5
+
+# Sessions with no activity for this long are disconnected by reap_idle_sessions
+SESSION_IDLE_SECONDS = 300
+SESSION_REAP_INTERVAL_SECONDS = 30
+
+# Result of the OpenAI reachability probe in health_check, shared by every client that polls it
+OPENAI_HEALTH_TTL_SECONDS = 10
+openai_health_cache = TTLCache(maxsize=1, ttl=OPENAI_HEALTH_TTL_SECONDS)
+openai_health_lock = Semaphore()
+
+def status_template(status, message, stage):
+    """Pre-serialize a processing_status payload, leaving it open for the timestamp"""
+    return orjson.dumps({'status': status, 'message': message, 'stage': stage})[:-1] + b',"timestamp":'
+
+
+# Constant processing_status payloads, serialized once up to their timestamp; see status_payload
+STATUS_STARTED = status_template('processing', 'Processing audio', 'started')
+STATUS_TRANSCRIBING = status_template('processing', 'Transcribing audio', 'transcription')
+STATUS_GENERATING_RESPONSE = status_template('processing', 'Generating response', 'llm')
+STATUS_CONVERTING_SPEECH = status_template('processing', 'Converting to speech', 'tts')
+STATUS_COMPLETED = status_template('completed', 'Processing completed successfully', 'completed')
+STATUS_PROCESSING_TRANSCRIPTION = status_template('processing', 'Processing transcription', 'llm')
+STATUS_GENERATING_SPEECH = status_template('processing', 'Generating speech', 'tts')
+STATUS_STREAMING_SPEECH = status_template('processing', 'Streaming speech', 'tts')
+STATUS_STREAMING_RESPONSE = status_template('processing', 'Streaming response', 'streaming')
+
+# Clients that connect with ?batch_events=1 get pipeline events through a per-client
+# queue, sent as `batch` events of up to this many [event, payload] pairs
+MAX_BATCH_EVENTS = 16
+
+# Constant part of the session_data sent with every `connected` server_status
+SERVER_INFO = {
+    'server_info': 'Voice Assistant WebSocket Server',
+    'webrtc_supported': True
+}
+
+# Format for base64 audio in `response` events; the mobile client plays it as an MP3 data URI
+LEGACY_AUDIO_FORMAT = 'mp3'
+
 # Error types for better error handling
 class ErrorTypes(Enum):
     NETWORK_ERROR = "network_error"
@@ -46,55 +181,193 @@ class PipelineStage(Enum):
     TRANSCRIBING = "transcription"
     PROCESSING = "llm"
     GENERATING_SPEECH = "tts"
+    STREAMING = "streaming"  # LLM and per-sentence TTS running together, see stream_response_chunks
     SENDING = "sending"
 
 
+# Plain-string enum values, resolved once instead of on every event
+ERR_NETWORK = ErrorTypes.NETWORK_ERROR.value
+ERR_AUTH = ErrorTypes.AUTH_ERROR.value
+ERR_RATE_LIMIT = ErrorTypes.RATE_LIMIT_ERROR.value
+ERR_API = ErrorTypes.API_ERROR.value
+ERR_PROCESSING = ErrorTypes.PROCESSING_ERROR.value
+ERR_VALIDATION = ErrorTypes.VALIDATION_ERROR.value
+
+STAGE_IDLE = PipelineStage.IDLE.value
+STAGE_RECEIVING = PipelineStage.RECEIVING.value
+STAGE_TRANSCRIBING = PipelineStage.TRANSCRIBING.value
+STAGE_PROCESSING = PipelineStage.PROCESSING.value
+STAGE_GENERATING_SPEECH = PipelineStage.GENERATING_SPEECH.value
+STAGE_STREAMING = PipelineStage.STREAMING.value
+STAGE_SENDING = PipelineStage.SENDING.value
+
+# Signaling targets handled by the server itself instead of being forwarded to a peer
+SERVER_TARGETS = frozenset({'server'})
+
+# Validation errors shared by the WebRTC signaling handlers; emit only serializes them,
+# so every rejected request reuses the same dict
+MISSING_OFFER_FIELDS_ERROR = {'type': ERR_VALIDATION, 'message': 'Missing target or SDP in offer request'}
+MISSING_ANSWER_FIELDS_ERROR = {'type': ERR_VALIDATION, 'message': 'Missing target or SDP in answer request'}
+MISSING_ICE_FIELDS_ERROR = {'type': ERR_VALIDATION, 'message': 'Missing target or candidate in ICE request'}
+TARGET_NOT_FOUND_ERROR = {'type': ERR_VALIDATION, 'message': 'Target client not found or not connected'}
+
+
+class ClientState:
+    """Session state for one connected client, kept in slots for fast attribute access"""
+    __slots__ = (
+        'id', 'audio_buffer', 'audio_chunk_count', 'is_processing', 'processing_lock', 'connected_at',
+        'connection_time', 'last_activity', 'user_agent', 'ip_address', 'reconnection_count', 'current_stage',
+        'using_webrtc', 'webrtc_chunks', 'conversation_history', 'file_format', 'sample_rate',
+        'vad', 'chunked_audio', 'audio_fd', 'upload_fd', 'upload_stream', 'stream_transcriber',
+        'outbox', 'event_tokens', 'event_tokens_at'
+    )
+    
+    def __init__(self, client_id, user_agent='Unknown', ip_address=None, reconnection_count=0,
+                 conversation_history=None):
+        now = time.monotonic_ns()
+        self.id = client_id
+        self.audio_buffer = bytearray()  # Direct uploads, appended in place
+        self.audio_chunk_count = 0  # Uploads appended to audio_buffer, reported as buffer_size
+        self.is_processing = False
+        self.processing_lock = threading.Lock()
+        self.connected_at = time.time()  # Wall clock, only for display
+        self.connection_time = now  # Monotonic ns, like every other internal timestamp
+        self.last_activity = now
+        self.user_agent = user_agent
+        self.ip_address = ip_address
+        self.reconnection_count = reconnection_count
+        self.current_stage = STAGE_IDLE
+        self.using_webrtc = False
+        self.webrtc_chunks = bytearray()
+        self.conversation_history = conversation_history or list(DEFAULT_HISTORY)
+        self.file_format = 'webm'
+        self.sample_rate = DEFAULT_SAMPLE_RATE
+        self.vad = True
+        self.chunked_audio = None  # In-progress chunked upload, see handle_audio_chunk_info
+        self.audio_fd = None  # Completed chunked upload waiting for process_audio
+        self.upload_fd = None  # Idle anonymous temp file reused by the next chunked upload
+        self.upload_stream = None  # Segments of a completed Float32 upload, see feed_upload_stream
+        self.stream_transcriber = None  # StreamingTranscriber for an active WebRTC stream
+        self.outbox = None  # Queue drained by sender_loop for clients that accept batched events
+        self.event_tokens = EVENT_BURST  # See take_event_token
+        self.event_tokens_at = now
+
+
+def take_event_token(client_info, cost=1):
+    """
+    Spend tokens from a client's event bucket, refilled at EVENT_RATE_PER_SECOND up to EVENT_BURST
+    
+    Args:
+        client_info: ClientState of the client sending the event
+        cost: Tokens the event costs
+        
+    Returns:
+        Whether the event may be handled
+    """
+    now = time.monotonic_ns()
+    tokens = min(EVENT_BURST, client_info.event_tokens + (now - client_info.event_tokens_at) * EVENT_RATE_PER_SECOND / 1e9)
+    client_info.event_tokens_at = now
+    if tokens < cost:
+        client_info.event_tokens = tokens
+        return False
+    client_info.event_tokens = tokens - cost
+    return True
+
+
+def with_client(handler):
+    """
+    Look up the calling client's session once and pass it to the handler
+
+    Handlers wrapped with this receive (client_id, client_info, *args) and are
+    never called for an unknown session; the client is told to reconnect instead.
+
+    Args:
+        handler: Socket.IO event handler taking client_id and client_info first
+
+    Returns:
+        Wrapped handler suitable for socketio.on
+    """
+    @wraps(handler)
+    def wrapper(*args):
+        client_id = request.sid
+        client_info = connected_clients.get(client_id)
+        if client_info is None:
+            logger.error("Client info not found: %s", client_id)
+            emit('error', {
+                'type': ERR_AUTH,
+                'message': 'Client session not found',
+                'reconnect': True
+            })
+            return
+        return handler(client_id, client_info, *args)
+    return wrapper
+
+
+def with_optional_client(handler):
+    """
+    Look up the calling client's session once for handlers that also serve unknown sessions
+
+    Like with_client, but the handler is always called, with client_info None when
+    the session is not found.
+
+    Args:
+        handler: Socket.IO event handler taking client_id and client_info first
+
+    Returns:
+        Wrapped handler suitable for socketio.on
+    """
+    @wraps(handler)
+    def wrapper(*args):
+        client_id = request.sid
+        return handler(client_id, connected_clients.get(client_id), *args)
+    return wrapper
+
+
+def register_session(client_id, reconnection_count=0, conversation_history=None):
+    """
+    Create the session for the current connection and join its private room
+    
+    A session already registered for this connection, e.g. by the connect event
+    that precedes a reconnect, is replaced but keeps its batched-event sender.
+    
+    Args:
+        client_id: Socket.IO session id of the current connection
+        reconnection_count: Number of times the client has reconnected
+        conversation_history: History to continue, or None to start fresh
+        
+    Returns:
+        The new ClientState
+    """
+    replaced = connected_clients.get(client_id)
+    client_info = connected_clients[client_id] = ClientState(
+        client_id,
+        request.headers.get('User-Agent', 'Unknown'),
+        request.remote_addr,
+        reconnection_count=reconnection_count,
+        conversation_history=conversation_history
+    )
+    
+    # Clients that understand `batch` events get pipeline events coalesced by one sender task
+    if replaced is not None and replaced.outbox is not None:
+        client_info.outbox = replaced.outbox
+    elif request.args.get('batch_events') == '1':
+        client_info.outbox = LightQueue()
+        socketio.start_background_task(sender_loop, client_id, client_info.outbox)
+    
+    # Join a private room for this client
+    join_room(client_id)
+    return client_info
+
+
 @socketio.on('connect')
 def handle_connect():
     """Handle new client connections"""
     client_id = request.sid
-    logger.info(f"Client connected: {client_id}")
+    logger.info("Client connected: %s", client_id)
     
     try:
-        # Get client information
-        user_agent = request.headers.get('User-Agent', 'Unknown')
-        ip_address = request.remote_addr
-        
         # Initialize client data
-        connected_clients[client_id] = {
-            'id': client_id,
-            'audio_buffer': [],
-            'is_processing': False,
-            'connection_time': time.time(),
-            'last_activity': time.time(),
-            'user_agent': user_agent,
-            'ip_address': ip_address,
-            'reconnection_count': 0,
-            'current_stage': PipelineStage.IDLE.value,
-            'using_webrtc': False,
-            'webrtc_chunks': [],
-            'conversation_history': [
-                {
-                    "role": "system", 
-                    "content": """You are a calming, supportive voice assistant designed to help people work through anxiety and panic attacks. You are speaking with the user over voice, and everything you say will be read out loud using realistic text-to-speech.
-
-Use natural, easy-to-understand language with short, clear sentences. Speak casually as a supportive friend. Speak in a calm, steady, and caring tone. Don't overwhelm the user with too much information at once. Keep most of your responses to one or two sentences unless the user asks you to go deeper. Use conversational markers like "okay," "let's try this," or "alright" to help things feel natural and human.
-
-The user may be feeling overwhelmed or scared. Your main job is to guide them through evidence-based calming techniques—like grounding, breathing, gentle questions, or mental exercises—in short cycles. Start by asking how they're feeling, and ask them to rate their anxiety level using a scale, like one to ten.
-
-After that, begin a calming cycle. This might include grounding techniques, breathing prompts, or simple supportive conversation. Keep your tone gentle and focused. Once a cycle is done, ask them to rate their anxiety again using the same scale. Repeat this cycle until the user says they feel calm enough to stop.
-
-At the end, ask them what helped the most and invite them to leave any notes or thoughts.
-
-Never try to end the conversation on your own. Don't rush the user or talk too much. Always ask clarifying questions if something's unclear.
-
-Remember, this is a voice conversation—avoid long answers, lists, or formal writing. Use language that feels like a supportive human talking gently in real time."""
-                }
-            ]
-        }
-        
-        # Join a private room for this client
-        join_room(client_id)
+        client_info = register_session(client_id)
         
         # Send confirmation with session data
         emit('server_status', {
@@ -103,19 +376,17 @@ Remember, this is a voice conversation—avoid long answers, lists, or formal wr
             'client_id': client_id,
             'session_data': {
                 'connection_time': time.strftime('%Y-%m-%d %H:%M:%S', 
-                                               time.localtime(connected_clients[client_id]['connection_time'])),
-                'server_info': 'Voice Assistant WebSocket Server',
-                'webrtc_supported': True
+                                               time.localtime(client_info.connected_at)),
+                **SERVER_INFO
             }
         })
         
-        logger.info(f"Client {client_id} successfully initialized")
+        logger.info("Client %s successfully initialized", client_id)
     
     except Exception as e:
-        logger.error(f"Error during client connection: {str(e)}")
-        logger.error(traceback.format_exc())
+        logger.exception(f"Error during client connection: {str(e)}")
         emit('error', {
-            'type': ErrorTypes.PROCESSING_ERROR.value,
+            'type': ERR_PROCESSING,
             'message': 'Failed to initialize client session',
             'details': str(e)
         })
@@ -125,106 +396,155 @@ Remember, this is a voice conversation—avoid long answers, lists, or formal wr
 def handle_disconnect():
     """Handle client disconnection"""
     client_id = request.sid
-    logger.info(f"Client disconnected: {client_id}")
+    logger.info("Client disconnected: %s", client_id)
     
     try:
-        # Store client info temporarily for logging
-        client_info = connected_clients.get(client_id, {})
-        connection_duration = 0
+        # Remove the session up front; the popped state is still used for logging and cleanup
+        client_info = connected_clients.pop(client_id, None)
         
         if client_info:
             # Calculate connection duration
-            if 'connection_time' in client_info:
-                connection_duration = time.time() - client_info['connection_time']
+            connection_duration = (time.monotonic_ns() - client_info.connection_time) / 1e9
             
             # Log disconnect event with details
-            logger.info(f"Client {client_id} disconnected after {connection_duration:.2f} seconds")
+            logger.info("Client %s disconnected after %.2f seconds", client_id, connection_duration)
             
             # Clean up client data
-            del connected_clients[client_id]
+            release_session(client_info)
         
         # Leave private room
         leave_room(client_id)
         
     except Exception as e:
-        logger.error(f"Error during client disconnection: {str(e)}")
-        logger.error(traceback.format_exc())
+        logger.exception(f"Error during client disconnection: {str(e)}")
+
+
+def release_session(client_info):
+    """Free a removed session's upload files and stop its batched-event sender"""
+    discard_audio_files(client_info)
+    close_upload_file(client_info.upload_fd)
+    client_info.upload_fd = None
+    if client_info.outbox is not None:
+        client_info.outbox.put(None)  # Stop sender_loop
+
+
+def store_in_background(store_call, *args):
+    """
+    Run a session_store write without blocking the hub or the caller
+    
+    redis-py uses blocking sockets and the hub is not monkey-patched, so the write runs
+    in tpool from its own green thread; the reply never waits on Redis.
+    """
+    if session_store.REDIS_URL:
+        socketio.start_background_task(tpool.execute, store_call, *args)
+
+
+def reap_idle_sessions():
+    """
+    Background task that disconnects clients idle for longer than SESSION_IDLE_SECONDS
+    
+    Sessions normally end with the disconnect event, but a client that vanished without
+    closing its socket, or whose disconnect was lost, would otherwise keep its buffers
+    until the worker restarts.
+    """
+    while True:
+        socketio.sleep(SESSION_REAP_INTERVAL_SECONDS)
+        cutoff = time.monotonic_ns() - SESSION_IDLE_SECONDS * 1_000_000_000
+        stale = [client_id for client_id, client_info in connected_clients.items()
+                 if client_info.last_activity < cutoff and not client_info.is_processing]
+        
+        for client_id in stale:
+            logger.info("Disconnecting idle client %s", client_id)
+            try:
+                socketio.server.disconnect(client_id)
+            except Exception as e:
+                logger.warning(f"Failed to disconnect idle client {client_id}: {e}")
+            
+            # The disconnect handler normally removes the session; drop it here if it didn't
+            client_info = connected_clients.pop(client_id, None)
+            if client_info:
+                release_session(client_info)
+
+
+socketio.start_background_task(reap_idle_sessions)
 
 
 @socketio.on('reconnect')
 def handle_reconnect(data):
     """Handle client reconnection attempts"""
     client_id = request.sid
-    logger.info(f"Client reconnection attempt: {client_id}")
+    logger.info("Client reconnection attempt: %s", client_id)
     
     previous_client_id = data.get('previous_client_id')
     
     try:
-        # Check if there's previous session data to restore
-        if previous_client_id and previous_client_id in connected_clients:
-            # Transfer conversation history and other important data
-            previous_data = connected_clients[previous_client_id]
-            
+        # History kept in the shared session store follows the client to its new session id,
+        # which also restores sessions that were served by another worker. redis-py blocks,
+        # so the transfer runs in tpool rather than on the hub.
+        restored_history, stored_reconnections = (
+            tpool.execute(session_store.transfer_session, previous_client_id, client_id)
+            if previous_client_id else ([], 0)
+        )
+        
+        # Check if there's previous session data to restore, taking it out of the table in one lookup
+        previous_data = connected_clients.pop(previous_client_id, None) if previous_client_id else None
+        if previous_data:
             # Create new session with previous data
-            connected_clients[client_id] = {
-                'id': client_id,
-                'audio_buffer': [],
-                'is_processing': False,
-                'connection_time': time.time(),
-                'last_activity': time.time(),
-                'user_agent': request.headers.get('User-Agent', 'Unknown'),
-                'ip_address': request.remote_addr,
-                'reconnection_count': previous_data.get('reconnection_count', 0) + 1,
-                'current_stage': PipelineStage.IDLE.value,
-                'using_webrtc': False,
-                'webrtc_chunks': [],
-                'conversation_history': previous_data.get('conversation_history', [
-                    {
-                        "role": "system", 
-                        "content": """You are a calming, supportive voice assistant designed to help people work through anxiety and panic attacks. You are speaking with the user over voice, and everything you say will be read out loud using realistic text-to-speech.
-
-Use natural, easy-to-understand language with short, clear sentences. Speak casually as a supportive friend. Speak in a calm, steady, and caring tone. Don't overwhelm the user with too much information at once. Keep most of your responses to one or two sentences unless the user asks you to go deeper. Use conversational markers like "okay," "let's try this," or "alright" to help things feel natural and human.
-
-The user may be feeling overwhelmed or scared. Your main job is to guide them through evidence-based calming techniques—like grounding, breathing, gentle questions, or mental exercises—in short cycles. Start by asking how they're feeling, and ask them to rate their anxiety level using a scale, like one to ten.
-
-After that, begin a calming cycle. This might include grounding techniques, breathing prompts, or simple supportive conversation. Keep your tone gentle and focused. Once a cycle is done, ask them to rate their anxiety again using the same scale. Repeat this cycle until the user says they feel calm enough to stop.
-
-At the end, ask them what helped the most and invite them to leave any notes or thoughts.
-
-Never try to end the conversation on your own. Don't rush the user or talk too much. Always ask clarifying questions if something's unclear.
-
-Remember, this is a voice conversation—avoid long answers, lists, or formal writing. Use language that feels like a supportive human talking gently in real time."""
-                    }
-                ])
-            }
+            client_info = register_session(
+                client_id,
+                reconnection_count=previous_data.reconnection_count + 1,
+                conversation_history=previous_data.conversation_history
+            )
+            store_in_background(session_store.save_session, client_id, client_info.reconnection_count)
             
             # Clean up old session
-            del connected_clients[previous_client_id]
+            discard_audio_files(previous_data)
+            close_upload_file(previous_data.upload_fd)
+            if previous_data.outbox is not None:
+                previous_data.outbox.put(None)  # Stop its sender_loop
             leave_room(previous_client_id)
             
-            # Join new room
-            join_room(client_id)
-            
             # Notify client of successful reconnection with session restoration
             emit('server_status', {
                 'status': 'reconnected',
                 'message': 'Successfully reconnected with session restoration',
                 'client_id': client_id,
                 'session_data': {
-                    'reconnection_count': connected_clients[client_id]['reconnection_count'],
+                    'reconnection_count': client_info.reconnection_count,
+                    'conversation_preserved': True
+                }
+            })
+            
+            logger.info("Client %s successfully reconnected (restored from %s)", client_id, previous_client_id)
+        
+        elif restored_history:
+            # Session lived on another worker; rebuild it from the shared history. The store
+            # keeps raw turns, not the in-process summary, so bring it back under the token budget.
+            conversation_history = list(DEFAULT_HISTORY) + restored_history
+            trim_history(conversation_history)
+            client_info = register_session(
+                client_id,
+                reconnection_count=stored_reconnections + 1,
+                conversation_history=conversation_history
+            )
+            store_in_background(session_store.save_session, client_id, client_info.reconnection_count)
+            
+            emit('server_status', {
+                'status': 'reconnected',
+                'message': 'Successfully reconnected with session restoration',
+                'client_id': client_id,
+                'session_data': {
+                    'reconnection_count': client_info.reconnection_count,
                     'conversation_preserved': True
                 }
             })
             
-            logger.info(f"Client {client_id} successfully reconnected (restored from {previous_client_id})")
+            logger.info("Client %s reconnected with %s stored messages from %s", client_id, len(restored_history), previous_client_id)
         
         else:
-            # Handle as new connection if no previous data
-            handle_connect()
-            
-            # Update reconnection count
-            if client_id in connected_clients:
-                connected_clients[client_id]['reconnection_count'] = 1
+            # Start a fresh session if there's no previous data
+            register_session(client_id, reconnection_count=1)
+            store_in_background(session_store.save_session, client_id, 1)
             
             # Notify client of reconnection without session restoration
             emit('server_status', {
@@ -237,30 +557,29 @@ Remember, this is a voice conversation—avoid long answers, lists, or formal wr
                 }
             })
             
-            logger.info(f"Client {client_id} reconnected as new session")
+            logger.info("Client %s reconnected as new session", client_id)
     
     except Exception as e:
-        logger.error(f"Error during client reconnection: {str(e)}")
-        logger.error(traceback.format_exc())
+        logger.exception(f"Error during client reconnection: {str(e)}")
         emit('error', {
-            'type': ErrorTypes.PROCESSING_ERROR.value,
+            'type': ERR_PROCESSING,
             'message': 'Failed to handle reconnection',
             'details': str(e)
         })
 
 
 @socketio.on('ping')
-def handle_ping():
+@with_optional_client
+def handle_ping(client_id, client_info):
     """Handle ping requests to check connection health"""
-    client_id = request.sid
-    
     try:
-        if client_id in connected_clients:
+        if client_info and take_event_token(client_info):
             # Update last activity timestamp
-            connected_clients[client_id]['last_activity'] = time.time()
+            now = time.monotonic_ns()
+            client_info.last_activity = now
             
             # Calculate session duration
-            session_duration = time.time() - connected_clients[client_id]['connection_time']
+            session_duration = (now - client_info.connection_time) / 1e9
             
             # Respond with connection health data
             emit('pong', {
@@ -270,136 +589,170 @@ def handle_ping():
             })
     
     except Exception as e:
-        logger.error(f"Error handling ping: {str(e)}")
+        logger.exception(f"Error handling ping: {str(e)}")
         emit('error', {
-            'type': ErrorTypes.NETWORK_ERROR.value,
+            'type': ERR_NETWORK,
             'message': 'Error processing ping',
             'details': str(e)
         })
 
 
 @socketio.on('audio')
-def handle_audio(data):
+@with_client
+def handle_audio(client_id, client_info, data):
     """Handle audio data from client"""
-    client_id = request.sid
-    logger.info(f"Received audio data from client: {client_id}")
+    logger.info("Received audio data from client: %s", client_id)
     
     try:
         # Update last activity timestamp
-        if client_id in connected_clients:
-            connected_clients[client_id]['last_activity'] = time.time()
+        client_info.last_activity = time.monotonic_ns()
         
         # Validate data
         if 'audio_data' not in data:
             logger.error(f"Missing audio_data in request from client {client_id}")
             emit('error', {
-                'type': ErrorTypes.VALIDATION_ERROR.value,
+                'type': ERR_VALIDATION,
                 'message': 'Missing audio_data in request'
             })
             return
         
-        # Get client info
-        client_info = connected_clients.get(client_id)
-        if not client_info:
-            logger.error(f"Client info not found: {client_id}")
+        if not take_event_token(client_info, AUDIO_EVENT_COST):
+            logger.warning(f"Rate limiting audio from client {client_id}")
             emit('error', {
-                'type': ErrorTypes.AUTH_ERROR.value,
-                'message': 'Client session not found',
-                'reconnect': True
+                'type': ERR_RATE_LIMIT,
+                'message': 'Too many audio requests'
             })
             return
         
-        # Check size limits to prevent abuse
-        audio_base64 = data['audio_data']
-        audio_size = len(audio_base64) * 0.75  # Approximate size of decoded data
+        # Check size limits to prevent abuse; base64 payloads are sized before they are decoded
+        payload = data['audio_data']
+        audio_size = len(payload) * 3 // 4 - payload[-2:].count('=') if isinstance(payload, str) else len(payload)
         file_format = data.get('file_format', 'webm')
-        logger.info(f"Received audio from client {client_id}: size={round(audio_size/1024, 2)}KB, format={file_format}")
         
-        if audio_size > 10 * 1024 * 1024:  # 10MB limit per chunk
+        if audio_size > MAX_AUDIO_MESSAGE_SIZE:
             logger.error(f"Audio size too large: {round(audio_size/1024/1024, 2)}MB (>10MB)")
             emit('error', {
-                'type': ErrorTypes.VALIDATION_ERROR.value,
+                'type': ERR_VALIDATION,
                 'message': 'Audio data exceeds size limit'
             })
             return
         
+        # Audio sent while an earlier recording is still processing piles up in the buffer
+        if len(client_info.audio_buffer) + audio_size > MAX_AUDIO_BUFFER_SIZE:
+            logger.error(f"Audio buffer for client {client_id} would exceed {MAX_AUDIO_BUFFER_SIZE} bytes")
+            emit('error', {
+                'type': ERR_VALIDATION,
+                'message': 'Audio buffer exceeds size limit'
+            })
+            return
+        
+        try:
+            audio_bytes = decode_audio_payload(payload)
+        except ValueError:
+            emit('error', {
+                'type': ERR_VALIDATION,
+                'message': 'Audio data is not valid base64'
+            })
+            return
+        audio_size = len(audio_bytes)
+        logger.info("Received audio from client %s: size=%.2fKB, format=%s", client_id, audio_size / 1024, file_format)
+        
         # Update client stage
-        client_info['current_stage'] = PipelineStage.RECEIVING.value
+        client_info.current_stage = STAGE_RECEIVING
         
         # Store file format with the audio data
-        client_info['file_format'] = file_format
+        client_info.file_format = file_format
+        client_info.sample_rate = data.get('sample_rate', DEFAULT_SAMPLE_RATE)
+        client_info.vad = data.get('vad', True)
         
         # Add audio to buffer
-        client_info['audio_buffer'].append(audio_base64)
+        client_info.audio_buffer += audio_bytes
+        client_info.audio_chunk_count += 1
         
-        # Send acknowledgment
-        emit('audio_received', {
+        # Send acknowledgment; for batching clients it shares a frame with the processing
+        # events that follow instead of taking a frame of its own
+        send_to_client(client_id, 'audio_received', {
             'status': 'success',
             'message': 'Audio data received',
             'chunk_size': round(audio_size / 1024, 2),  # Size in KB
-            'buffer_size': len(client_info['audio_buffer'])
+            'buffer_size': client_info.audio_chunk_count,  # Number of chunks buffered
+            'buffer_kb': round(len(client_info.audio_buffer) / 1024, 2)  # Size in KB
         })
         
-        logger.info(f"Audio received successfully from client {client_id}, now processing automatically")
+        logger.info("Audio received successfully from client %s, now processing automatically", client_id)
         
         # Process the audio automatically
-        process_audio(client_id)
+        socketio.start_background_task(process_audio, client_id)
     
     except Exception as e:
-        logger.error(f"Error handling audio: {str(e)}")
-        logger.error(traceback.format_exc())
+        logger.exception(f"Error handling audio: {str(e)}")
         emit('error', {
-            'type': ErrorTypes.PROCESSING_ERROR.value,
+            'type': ERR_PROCESSING,
             'message': f'Error processing audio: {str(e)}',
             'retry': True
         })
 
 
 @socketio.on('audio_chunk_info')
-def handle_audio_chunk_info(data):
+@with_client
+def handle_audio_chunk_info(client_id, client_info, data):
     """Handle information about incoming chunked audio data"""
-    client_id = request.sid
-    logger.info(f"Received audio chunk info from client: {client_id}")
+    logger.info("Received audio chunk info from client: %s", client_id)
     
     try:
-        # Update last activity timestamp
-        if client_id in connected_clients:
-            connected_clients[client_id]['last_activity'] = time.time()
+        # Update last activity timestamp; the same reading is the upload's start time
+        now = client_info.last_activity = time.monotonic_ns()
         
-        # Get client info
-        client_info = connected_clients.get(client_id)
-        if not client_info:
-            logger.error(f"Client info not found: {client_id}")
+        # Validate data
+        if not all(k in data for k in ['total_chunks', 'file_format', 'total_size']):
             emit('error', {
-                'type': ErrorTypes.AUTH_ERROR.value,
-                'message': 'Client session not found',
-                'reconnect': True
+                'type': ERR_VALIDATION,
+                'message': 'Missing required chunk info data'
             })
             return
         
-        # Validate data
-        if not all(k in data for k in ['total_chunks', 'file_format', 'total_size']):
+        if data['total_size'] > MAX_UPLOAD_SIZE:
             emit('error', {
-                'type': ErrorTypes.VALIDATION_ERROR.value,
-                'message': 'Missing required chunk info data'
+                'type': ERR_VALIDATION,
+                'message': 'Audio data exceeds size limit'
             })
             return
         
-        # Initialize or reset chunked audio reception
-        client_info['chunked_audio'] = {
+        # Drop any earlier upload that was never processed
+        discard_audio_files(client_info)
+        
+        # Initialize chunked audio reception. Chunks are written straight to their offset in
+        # the client's anonymous temp file, so the upload is never held in memory and no
+        # file is created or unlinked per utterance. total_size is the payload length,
+        # which for base64 clients is an upper bound on the decoded size.
+        audio_fd = client_info.upload_fd if client_info.upload_fd is not None else open_upload_file()
+        client_info.upload_fd = None
+        os.ftruncate(audio_fd, 0)
+        client_info.chunked_audio = {
             'total_chunks': data['total_chunks'],
             'received_chunks': 0,
-            'chunks': [None] * data['total_chunks'],  # Pre-allocate array for chunks
+            'fd': audio_fd,
+            'offsets': [None] * data['total_chunks'],  # (offset, length) of each stored chunk
+            'chunk_size': data.get('chunk_size'),  # Decoded size of every chunk but the last
+            'ack_interval': max(1, data['total_chunks'] // 20),  # Acknowledge ~20 times per upload
+            'progress_scale': 100.0 / data['total_chunks'],  # Percent per received chunk
             'file_format': data['file_format'],
             'total_size': data['total_size'],
-            'start_time': time.time()
+            'start_time': now
         }
+        client_info.sample_rate = data.get('sample_rate', DEFAULT_SAMPLE_RATE)
+        client_info.vad = data.get('vad', True)
+        
+        # Raw Float32 PCM can be segmented and transcribed while the rest is still uploading
+        if normalize_file_format(data['file_format']) == 'f32' and client_info.vad:
+            client_info.chunked_audio['stream'] = start_upload_stream(client_info.sample_rate)
         
         # Clear any existing audio buffer
-        client_info['audio_buffer'] = []
+        client_info.audio_buffer = bytearray()
+        client_info.audio_chunk_count = 0
         
         # Update client stage
-        client_info['current_stage'] = PipelineStage.RECEIVING.value
+        client_info.current_stage = STAGE_RECEIVING
         
         # Send acknowledgment
         emit('chunk_info_received', {
@@ -408,52 +761,40 @@ def handle_audio_chunk_info(data):
             'chunk_count': data['total_chunks']
         })
         
-        logger.info(f"Prepared to receive {data['total_chunks']} audio chunks from {client_id}")
+        logger.info("Prepared to receive %s audio chunks from %s", data['total_chunks'], client_id)
     
     except Exception as e:
-        logger.error(f"Error handling audio chunk info: {str(e)}")
-        logger.error(traceback.format_exc())
+        logger.exception(f"Error handling audio chunk info: {str(e)}")
         emit('error', {
-            'type': ErrorTypes.PROCESSING_ERROR.value,
+            'type': ERR_PROCESSING,
             'message': f'Error processing chunk info: {str(e)}',
             'retry': True
         })
 
 
 @socketio.on('audio_chunk')
-def handle_audio_chunk(data):
+@with_client
+def handle_audio_chunk(client_id, client_info, data):
     """Handle a single chunk of audio data from the client"""
-    client_id = request.sid
-    logger.debug(f"Received audio chunk from client: {client_id}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Received audio chunk from client: %s", client_id)
     
     try:
-        # Update last activity timestamp
-        if client_id in connected_clients:
-            connected_clients[client_id]['last_activity'] = time.time()
-        
-        # Get client info
-        client_info = connected_clients.get(client_id)
-        if not client_info:
-            logger.error(f"Client info not found: {client_id}")
-            emit('error', {
-                'type': ErrorTypes.AUTH_ERROR.value,
-                'message': 'Client session not found',
-                'reconnect': True
-            })
-            return
+        # Update last activity timestamp; the same reading times a completed transfer
+        now = client_info.last_activity = time.monotonic_ns()
         
         # Validate data
         if not all(k in data for k in ['chunk_data', 'chunk_index', 'is_last']):
             emit('error', {
-                'type': ErrorTypes.VALIDATION_ERROR.value,
+                'type': ERR_VALIDATION,
                 'message': 'Missing required chunk data fields'
             })
             return
         
         # Check if chunked_audio structure is initialized
-        if 'chunked_audio' not in client_info:
+        if client_info.chunked_audio is None:
             emit('error', {
-                'type': ErrorTypes.VALIDATION_ERROR.value,
+                'type': ERR_VALIDATION,
                 'message': 'No chunk info received before chunk data'
             })
             return
@@ -464,45 +805,82 @@ def handle_audio_chunk(data):
         is_last = data['is_last']
         
         # Validate chunk index
-        if chunk_index < 0 or chunk_index >= client_info['chunked_audio']['total_chunks']:
+        if chunk_index < 0 or chunk_index >= client_info.chunked_audio['total_chunks']:
             emit('error', {
-                'type': ErrorTypes.VALIDATION_ERROR.value,
+                'type': ERR_VALIDATION,
                 'message': f'Invalid chunk index: {chunk_index}'
             })
             return
         
-        # Store the chunk
-        client_info['chunked_audio']['chunks'][chunk_index] = chunk_data
-        client_info['chunked_audio']['received_chunks'] += 1
-        
-        # Calculate progress
-        received = client_info['chunked_audio']['received_chunks']
-        total = client_info['chunked_audio']['total_chunks']
-        progress = (received / total) * 100
-        
-        # Send acknowledgment with progress
-        emit('chunk_received', {
-            'status': 'success',
-            'chunk_index': chunk_index,
-            'received_chunks': received,
-            'total_chunks': total,
-            'progress': progress
-        })
+        # Write the chunk into its slot in the temp file
+        chunked_audio = client_info.chunked_audio
+        try:
+            chunk_bytes = decode_audio_payload(chunk_data)
+        except ValueError:
+            emit('error', {
+                'type': ERR_VALIDATION,
+                'message': f'Chunk {chunk_index} is not valid base64'
+            })
+            return
+        if chunked_audio['chunk_size'] is None and not is_last:
+            chunked_audio['chunk_size'] = len(chunk_bytes)
+        if chunk_index and not chunked_audio['chunk_size']:
+            emit('error', {
+                'type': ERR_VALIDATION,
+                'message': 'Cannot place last chunk before the chunk size is known'
+            })
+            return
+        offset = chunk_index * (chunked_audio['chunk_size'] or 0)
+        end = offset + len(chunk_bytes)
+        if end > chunked_audio['total_size']:
+            emit('error', {
+                'type': ERR_VALIDATION,
+                'message': f'Chunk {chunk_index} exceeds declared total_size'
+            })
+            return
+        os.pwrite(chunked_audio['fd'], chunk_bytes, offset)
+        if chunked_audio['offsets'][chunk_index] is None:
+            chunked_audio['received_chunks'] += 1
+        chunked_audio['offsets'][chunk_index] = (offset, len(chunk_bytes))
+        if 'stream' in chunked_audio:
+            feed_upload_stream(chunked_audio)
+        
+        received = chunked_audio['received_chunks']
+        total = chunked_audio['total_chunks']
+        complete = is_last or received == total
+        
+        # The final ack and chunks_complete are sent back to back; cork the connection
+        # so they leave in one TCP segment instead of two
+        corked_socket = cork_client_socket() if complete else None
+        
+        # Send acknowledgment with progress, batched so long uploads don't get one frame per chunk;
+        # progress is only worked out when it is actually sent
+        if received % chunked_audio['ack_interval'] == 0 or complete:
+            emit('chunk_received', {
+                'status': 'success',
+                'chunk_index': chunk_index,
+                'received_chunks': received,
+                'total_chunks': total,
+                'progress': received * chunked_audio['progress_scale']
+            })
         
-        logger.debug(f"Received chunk {chunk_index+1}/{total} ({progress:.1f}%) from {client_id}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Received chunk %s/%s (%.1f%%) from %s", chunk_index+1, total, received * chunked_audio['progress_scale'], client_id)
         
         # If this is the last chunk or all chunks are received, process the complete audio
-        if is_last or received == total:
-            logger.info(f"All {received} audio chunks received from {client_id}")
+        if complete:
+            logger.info("All %s audio chunks received from %s", received, client_id)
             
-            # Combine chunks and add to the audio buffer
-            complete_audio = ''.join(filter(None, client_info['chunked_audio']['chunks']))
-            client_info['audio_buffer'] = [complete_audio]
-            client_info['file_format'] = client_info['chunked_audio']['file_format']
+            # The temp file already holds the complete upload; hand it to process_audio
+            client_info.audio_fd = chunked_audio['fd']
+            client_info.upload_stream = chunked_audio.get('stream')
+            client_info.audio_buffer = bytearray()
+            client_info.audio_chunk_count = 0
+            client_info.file_format = client_info.chunked_audio['file_format']
             
             # Calculate metrics
-            transfer_time = time.time() - client_info['chunked_audio']['start_time']
-            total_size = client_info['chunked_audio']['total_size'] 
+            transfer_time = (now - client_info.chunked_audio['start_time']) / 1e9
+            total_size = client_info.chunked_audio['total_size'] 
             transfer_rate = (total_size / 1024) / transfer_time  # KB/s
             
             # Send completion notification
@@ -516,30 +894,35 @@ def handle_audio_chunk(data):
                     'audio_size_kb': round(total_size / 1024, 2)
                 }
             })
+            uncork_client_socket(corked_socket)
             
-            logger.info(f"Audio transfer complete: {received} chunks, {round(total_size/1024, 2)}KB in {round(transfer_time, 2)}s at {round(transfer_rate, 2)}KB/s from {client_id}")
+            logger.info("Audio transfer complete: %s chunks, %.2fKB in %.2fs at %.2fKB/s from %s", received, total_size / 1024, transfer_time, transfer_rate, client_id)
             
             # Clean up the chunked_audio data
-            del client_info['chunked_audio']
+            client_info.chunked_audio = None
             
             # Automatically process the audio after receiving all chunks
             # instead of waiting for a separate process_audio event
-            logger.info(f"Auto-processing received audio for {client_id}")
-            process_audio(client_id)
+            logger.info("Auto-processing received audio for %s", client_id)
+            socketio.start_background_task(process_audio, client_id)
     
     except Exception as e:
-        logger.error(f"Error handling audio chunk: {str(e)}")
-        logger.error(traceback.format_exc())
+        logger.exception(f"Error handling audio chunk: {str(e)}")
         emit('error', {
-            'type': ErrorTypes.PROCESSING_ERROR.value,
+            'type': ERR_PROCESSING,
             'message': f'Error processing audio chunk: {str(e)}',
             'retry': True
         })
 
 
 def process_audio(client_id):
-    """Process audio data for a specific client"""
-    logger.info(f"Processing audio for client: {client_id}")
+    """
+    Process audio data for a specific client
+    
+    Runs as a Socket.IO background task, outside the request context, so every
+    event is sent with socketio.emit to the client's private room.
+    """
+    logger.info("Processing audio for client: %s", client_id)
     
     try:
         # Get client info
@@ -549,109 +932,119 @@ def process_audio(client_id):
             return
         
         # Check if we have audio data to process
-        if not client_info['audio_buffer']:
+        if not client_info.audio_buffer and client_info.audio_fd is None:
             logger.error(f"No audio data to process for client: {client_id}")
-            emit('error', {
-                'type': ErrorTypes.VALIDATION_ERROR.value,
+            socketio.emit('error', {
+                'type': ERR_VALIDATION,
                 'message': 'No audio data to process'
             }, room=client_id)
             return
         
-        # Check if already processing
-        if client_info['is_processing']:
+        # Check if already processing; the lock makes check-and-set atomic across greenlets
+        if not client_info.processing_lock.acquire(blocking=False):
             logger.warning(f"Client {client_id} is already processing audio")
-            emit('error', {
-                'type': ErrorTypes.PROCESSING_ERROR.value,
+            socketio.emit('error', {
+                'type': ERR_PROCESSING,
                 'message': 'Already processing audio'
             }, room=client_id)
             return
         
         # Mark client as processing
-        client_info['is_processing'] = True
-        
-        # 1. Notify that processing has started
-        client_info['current_stage'] = PipelineStage.IDLE.value
-        emit('processing_status', {
-            'status': 'processing',
-            'message': 'Processing audio',
-            'stage': 'started',
-            'timestamp': time.time()
-        }, room=client_id)
+        client_info.is_processing = True
         
-        # 2. Decode and save audio to temporary file
-        audio_data = decode_and_combine_audio(client_info['audio_buffer'])
-        
-        # Get file format from client info, default to webm
-        file_format = client_info.get('file_format', 'webm')
-        logger.info(f"Processing audio in format: {file_format}, size: {len(audio_data)} bytes")
-        
-        # Create appropriate file extension based on format
-        if file_format == 'm4a':
-            file_extension = '.m4a'
-        elif file_format == 'mp3':
-            file_extension = '.mp3'
-        elif file_format == 'wav':
-            file_extension = '.wav'
-        else:
-            file_extension = '.webm'  # Default format
-        
-        with tempfile.NamedTemporaryFile(suffix=file_extension, delete=False) as temp_file:
-            temp_file_path = temp_file.name
-            temp_file.write(audio_data)
-            logger.info(f"Saved audio to temporary file: {temp_file_path}")
+        # Take ownership of a chunked upload's temp file so a new upload can't overwrite it
+        audio_fd = client_info.audio_fd
+        client_info.audio_fd = None
+        upload_stream = client_info.upload_stream
+        client_info.upload_stream = None
+        audio_file = None
         
         try:
+            # 1. Notify that processing has started
+            client_info.current_stage = STAGE_IDLE
+            send_to_client(client_id, 'processing_status', status_payload(STATUS_STARTED))
+            
+            # 2. Chunked uploads are already on disk; direct uploads are taken from the buffer
+            file_format = normalize_file_format(client_info.file_format)
+            if upload_stream is not None:
+                # Already segmented while uploading; nothing to read back
+                audio_data = None
+                audio_size = os.fstat(audio_fd).st_size
+            elif audio_fd is not None and file_format != 'f32':
+                audio_data = None
+                audio_file = os.fdopen(os.dup(audio_fd), 'rb')
+                audio_size = os.fstat(audio_fd).st_size
+            else:
+                if audio_fd is not None:
+                    # Raw PCM is wrapped in a WAV container in memory before upload
+                    audio_data = os.pread(audio_fd, os.fstat(audio_fd).st_size, 0)
+                else:
+                    audio_data = client_info.audio_buffer
+                    client_info.audio_buffer = bytearray()
+                    client_info.audio_chunk_count = 0
+                audio_size = len(audio_data)
+            logger.info("Processing audio in format: %s, size: %s bytes", file_format, audio_size)
+            
             # 3. Transcribe audio
-            client_info['current_stage'] = PipelineStage.TRANSCRIBING.value
-            emit('processing_status', {
-                'status': 'processing',
-                'message': 'Transcribing audio',
-                'stage': 'transcription',
-                'timestamp': time.time()
-            }, room=client_id)
+            client_info.current_stage = STAGE_TRANSCRIBING
+            send_to_client(client_id, 'processing_status', status_payload(STATUS_TRANSCRIBING))
             
             try:
-                # Convert WAV file to MP3 if needed (some WAV formats aren't supported by Whisper)
-                if file_format == 'wav':
-                    logger.info(f"Received WAV file, making sure it's in a supported format")
-                    try:
-                        import subprocess
-                        
-                        # Convert WAV to MP3 using ffmpeg
-                        mp3_file_path = temp_file_path.replace('.wav', '.mp3')
-                        subprocess.run(['ffmpeg', '-i', temp_file_path, '-acodec', 'libmp3lame', '-y', mp3_file_path], 
-                                      check=True, capture_output=True)
-                        
-                        logger.info(f"Successfully converted WAV to MP3: {mp3_file_path}")
-                        # Use the converted file
-                        if os.path.exists(mp3_file_path) and os.path.getsize(mp3_file_path) > 0:
-                            temp_file_path = mp3_file_path
-                            file_format = 'mp3'
-                        else:
-                            logger.warning(f"Conversion failed or output file is empty, trying with original WAV")
-                    except Exception as convert_error:
-                        logger.warning(f"Failed to convert WAV to MP3: {str(convert_error)}")
-                        # Continue with the original file
+                if upload_stream is not None:
+                    # Segments closed during the upload are already being transcribed
+                    futures = finish_upload_stream(upload_stream)
+                    pcm = None
+                else:
+                    futures = None
+                    # Decode once for voice activity detection and segmenting, off the hub since
+                    # uploads can be large (raw Float32 PCM has no container to probe, so it is always sent as-is)
+                    pcm = tpool.execute(decode_pcm16, audio_file or audio_data) if file_format != 'f32' else None
+                
+                # Skip the Whisper round-trip entirely when the recording is just silence or noise
+                if futures == [] or (client_info.vad and pcm is not None and not tpool.execute(contains_speech, pcm)):
+                    logger.info("No speech detected for client %s, skipping transcription", client_id)
+                    send_to_client(client_id, 'transcription', {
+                        'text': '',
+                        'timestamp': time.time()
+                    })
+                    client_info.current_stage = STAGE_IDLE
+                    return
                 
-                # Send the file for transcription
-                logger.info(f"Sending file for transcription: {temp_file_path} (format: {file_format})")
-                transcription = transcribe_audio_file(temp_file_path)
-                logger.info(f"Transcription: {transcription}")
+                if futures:
+                    logger.info("Collecting transcription of %s streamed segments", len(futures))
+                    transcription = collect_transcriptions(client_id, futures)
+                elif pcm is not None and len(pcm) > LONG_AUDIO_SECONDS * VAD_SAMPLE_RATE * 2:
+                    # Long recordings: transcribe the pieces between pauses concurrently
+                    segments = tpool.execute(split_on_silence, pcm)
+                    logger.info("Sending audio for transcription in %s segments", len(segments))
+                    transcription = transcribe_segments(client_id, segments)
+                else:
+                    # Send the audio for transcription from the upload file or straight from memory,
+                    # off the hub so other clients keep being served during the Whisper call
+                    logger.info("Sending audio for transcription (format: %s)", file_format)
+                    transcription = tpool.execute(
+                        transcribe_upload,
+                        audio_data,
+                        audio_file,
+                        file_format,
+                        client_info.sample_rate
+                    )
+                logger.info("Transcription: %s", transcription)
                 
                 # Send transcription to client
-                emit('transcription', {
+                send_to_client(client_id, 'transcription', {
                     'text': transcription,
                     'timestamp': time.time()
-                }, room=client_id)
+                })
                 
                 # Set client back to idle after transcription
-                client_info['current_stage'] = PipelineStage.IDLE.value
-                client_info['is_processing'] = False
+                client_info.current_stage = STAGE_IDLE
+                client_info.is_processing = False
                 
             except Exception as transcription_error:
-                logger.error(f"Transcription error: {str(transcription_error)}")
-                emit('error', {
-                    'type': ErrorTypes.API_ERROR.value,
+                # Logged with its traceback once, by the outer handler
+                socketio.emit('error', {
+                    'type': ERR_API,
                     'message': 'Failed to transcribe audio',
                     'details': str(transcription_error),
                     'stage': 'transcription'
@@ -659,139 +1052,840 @@ def process_audio(client_id):
                 raise
                 
         finally:
-            # Clean up temporary files
-            for file_path in [temp_file_path, temp_file_path.replace('.wav', '.mp3')]:
-                if os.path.exists(file_path):
-                    try:
-                        os.unlink(file_path)
-                    except Exception as e:
-                        logger.warning(f"Failed to delete temporary file {file_path}: {str(e)}")
-            
             # Reset the audio buffer
-            client_info['audio_buffer'] = []
-            client_info['is_processing'] = False
+            client_info.audio_buffer = bytearray()
+            client_info.audio_chunk_count = 0
+            client_info.is_processing = False
+            client_info.processing_lock.release()
+            if audio_file:
+                audio_file.close()
+            if audio_fd is not None:
+                release_upload_file(client_id, audio_fd)
     
     except Exception as e:
-        logger.error(f"Error processing audio: {str(e)}")
-        logger.error(traceback.format_exc())
-        emit('error', {
-            'type': ErrorTypes.PROCESSING_ERROR.value,
+        logger.exception(f"Error processing audio: {str(e)}")
+        socketio.emit('error', {
+            'type': ERR_PROCESSING,
             'message': f'Error processing audio: {str(e)}',
             'recoverable': True
         }, room=client_id)
         
         # Reset processing state and update stage
-        if client_id in connected_clients:
-            connected_clients[client_id]['is_processing'] = False
-            connected_clients[client_id]['current_stage'] = PipelineStage.IDLE.value
+        client_info = connected_clients.get(client_id)
+        if client_info:
+            client_info.is_processing = False
+            client_info.current_stage = STAGE_IDLE
+
+
+def status_payload(template):
+    """
+    Complete a pre-serialized processing_status payload with the current time
+    
+    The returned orjson Fragment is embedded verbatim by the orjson Socket.IO codec,
+    so the constant fields are never rebuilt or re-serialized. With a Redis message
+    queue, emits are pickled between workers, so a plain dict is returned instead.
+    """
+    payload = template + repr(time.time()).encode() + b'}'
+    if session_store.REDIS_URL:
+        return orjson.loads(payload)
+    return orjson.Fragment(payload)
+
+
+def send_to_client(client_id, event, payload):
+    """
+    Send a pipeline event to a client, through its outbox when it accepts batched events
+    
+    Args:
+        client_id: Client to send to
+        event: Socket.IO event name
+        payload: Event payload, which may be or contain bytes
+    """
+    send_to_session(client_id, connected_clients.get(client_id), event, payload)
+
+
+def send_to_session(client_id, client_info, event, payload):
+    """Like send_to_client, for callers that already looked up the client's session (or got None)"""
+    if client_info is not None and client_info.outbox is not None:
+        client_info.outbox.put_nowait((event, payload))
+    else:
+        socketio.emit(event, payload, room=client_id)
+
+
+def sender_loop(client_id, outbox):
+    """
+    Background task that drains a client's outbox, sending queued events as `batch` events
+    
+    Events already waiting when the task wakes are merged into one frame, up to
+    MAX_BATCH_EVENTS at a time. Back-to-back processing_status events in a batch
+    are collapsed to the newest, since the client only shows the current stage.
+    A None in the queue stops the task.
+    """
+    while True:
+        item = outbox.get()
+        if item is None:
+            return
+        
+        batch = [item]
+        while len(batch) < MAX_BATCH_EVENTS and not outbox.empty():
+            item = outbox.get_nowait()
+            if item is None:
+                break
+            batch.append(item)
+        
+        events = []
+        for event, payload in batch:
+            if event == 'processing_status' and events and events[-1][0] == 'processing_status':
+                events[-1][1] = payload
+            else:
+                events.append([event, payload])
+        
+        socketio.emit('batch', events, room=client_id)
+        if item is None:
+            return
+
+
+def send_audio_frames(chunks, room, response_format):
+    """
+    Send audio to a client as binary Socket.IO frames instead of base64 JSON
+    
+    Args:
+        chunks: Iterable of audio byte chunks
+        room: Client room to send to
+        response_format: Audio encoding, reported in the end event
+        
+    Returns:
+        All audio bytes that were sent
+    """
+    sent = bytearray()
+    for chunk in chunks:
+        send_to_client(room, 'response_audio', chunk)
+        sent += chunk
+    
+    send_to_client(room, 'response_audio_end', {
+        'size': len(sent),
+        'format': response_format,
+        'timestamp': time.time()
+    })
+    return bytes(sent)
+
+
+def synthesize_speech(text, voice=TTS_DEFAULT_VOICE, response_format=TTS_DEFAULT_FORMAT):
+    """
+    Generate speech on eventlet's thread pool, refusing work past MAX_PENDING_SPEECH
+    
+    Args:
+        text: Text to convert to speech
+        voice: Voice to use for TTS
+        response_format: Audio encoding to request, one of TTS_FORMATS
+        
+    Returns:
+        Base64 encoded audio data
+    """
+    global pending_speech
+    if pending_speech >= MAX_PENDING_SPEECH:
+        raise RuntimeError('Speech generation is busy, please try again shortly')
+    
+    pending_speech += 1
+    try:
+        # Repeated replies (e.g. cached chat responses) reuse their audio
+        return tpool.execute(generate_speech_cached, text, voice, response_format)
+    finally:
+        pending_speech -= 1
+
+
+def stream_response_chunks(client_id, messages, voice, response_format, with_speech=True):
+    """
+    Stream the LLM reply to a client one sentence at a time
+    
+    Each sentence's speech is generated while the model keeps writing, and
+    response_chunk events carrying the sentence and its base64 audio are sent
+    in order as soon as they and everything before them are ready.
+    
+    Args:
+        client_id: Client room to send response_chunk events to
+        messages: Conversation history to send to the model
+        voice: Voice to use for TTS
+        response_format: Audio encoding to request, one of TTS_FORMATS
+        with_speech: Whether to generate speech for each sentence
+        
+    Returns:
+        Full response text
+    """
+    collected = []
+    pending = ''
+    speech_jobs = deque()
+    seq = 0
+    
+    def submit(sentence):
+        nonlocal seq
+        job = eventlet.spawn(synthesize_speech, sentence, voice, response_format) if with_speech else None
+        speech_jobs.append((seq, sentence, job))
+        seq += 1
+    
+    def drain(block=False):
+        while speech_jobs and (block or speech_jobs[0][2] is None or speech_jobs[0][2].dead):
+            chunk_seq, sentence, job = speech_jobs.popleft()
+            try:
+                audio_data = job.wait() if job else None
+            except Exception as speech_error:
+                logger.warning(f"Speech failed for sentence {chunk_seq}: {str(speech_error)}")
+                audio_data = None
+            send_to_client(client_id, 'response_chunk', {
+                'seq': chunk_seq,
+                'text': sentence,
+                'audio': audio_data,
+                'audio_format': response_format,
+                'timestamp': time.time()
+            })
+    
+    try:
+        # The proxy pulls each delta on eventlet's thread pool instead of blocking the hub
+        for delta in tpool.Proxy(stream_chat_response(messages)):
+            collected.append(delta)
+            sentences, pending = pop_sentences(pending + delta)
+            for sentence in sentences:
+                submit(sentence)
+            drain()
+        
+        if pending.strip():
+            submit(pending.strip())
+        drain(block=True)
+    finally:
+        # Stop speech nobody will receive after a failure
+        for _, _, job in speech_jobs:
+            if job:
+                job.kill()
+    
+    return ''.join(collected).strip()
+
+
+def send_deferred_speech(client_id, text, voice, response_format):
+    """Background task that sends a reply's speech as a response_speech event once it is ready"""
+    try:
+        audio_data = synthesize_speech(text, voice=voice, response_format=response_format)
+        send_to_client(client_id, 'response_speech', {
+            'audio': audio_data,
+            'audio_format': response_format,
+            'timestamp': time.time()
+        })
+    except Exception as speech_error:
+        logger.exception(f"Error generating deferred speech: {str(speech_error)}")
+        socketio.emit('error', {
+            'type': ERR_API,
+            'message': 'Failed to generate speech audio',
+            'details': str(speech_error),
+            'stage': 'tts'
+        }, room=client_id)
+
+
+def stream_speech_to_client(text, voice, room, response_format=TTS_DEFAULT_FORMAT):
+    """Stream TTS audio to a client as binary frames as it is generated, returning the audio bytes"""
+    # Each chunk is read on eventlet's thread pool so the hub keeps serving other clients
+    chunks = tpool.Proxy(stream_speech(text, voice=voice, response_format=response_format))
+    return send_audio_frames(chunks, room, response_format)
+
+
+def utterance_cache_key(text, voice, audio_format, generate_speech, binary_audio):
+    """
+    Build the utterance_cache key for a user message
+    
+    Case and punctuation are ignored, and a bare number is keyed as a rating.
+    
+    Returns:
+        Cache key tuple, or None for an empty message
+    """
+    normalized = ' '.join(re.sub(r'[^\w\s]', '', text.lower()).split())
+    if not normalized:
+        return None
+    if normalized.isdigit():
+        normalized = f"rating:{int(normalized)}"
+    return (normalized, voice, audio_format, generate_speech, binary_audio)
 
 
-def decode_and_combine_audio(audio_buffer):
-    """Decode base64 audio chunks and combine them"""
-    combined_audio = bytearray()
+def decode_pcm16(audio_data):
+    """
+    Decode audio to 16 kHz mono PCM16 in-process with PyAV
     
-    for audio_base64 in audio_buffer:
-        chunk_data = base64.b64decode(audio_base64)
-        combined_audio.extend(chunk_data)
+    Args:
+        audio_data: Encoded audio bytes, or a binary file object positioned at the start
+        
+    Returns:
+        PCM bytes at VAD_SAMPLE_RATE, or None if the audio can't be decoded
+    """
+    try:
+        resampler = av.AudioResampler(format='s16', layout='mono', rate=VAD_SAMPLE_RATE)
+        pcm = bytearray()
+        with av.open(audio_data if hasattr(audio_data, 'read') else BytesIO(audio_data)) as container:
+            for frame in container.decode(audio=0):
+                for resampled in resampler.resample(frame):
+                    pcm += resampled.to_ndarray().tobytes()
+            for resampled in resampler.resample(None):
+                pcm += resampled.to_ndarray().tobytes()
+        return pcm
+    except Exception as e:
+        logger.warning(f"Could not decode audio for voice activity detection: {str(e)}")
+        return None
+
+
+def contains_speech(pcm):
+    """
+    Check whether recorded audio contains any speech using WebRTC VAD
     
-    return combined_audio
+    Args:
+        pcm: 16 kHz mono PCM16 audio from decode_pcm16
+        
+    Returns:
+        False if fewer than VAD_MIN_SPEECH_FRAMES 30 ms frames contain speech, True otherwise
+    """
+    speech_frames = 0
+    for offset in range(0, len(pcm) - VAD_FRAME_BYTES + 1, VAD_FRAME_BYTES):
+        if vad.is_speech(pcm[offset:offset + VAD_FRAME_BYTES], VAD_SAMPLE_RATE):
+            speech_frames += 1
+            if speech_frames >= VAD_MIN_SPEECH_FRAMES:
+                return True
+    return False
+
+
+def split_on_silence(pcm):
+    """
+    Split PCM16 audio into segments of at least MIN_SEGMENT_SECONDS at pauses
+    
+    Cuts fall in the middle of a run of SEGMENT_SILENCE_FRAMES non-speech
+    frames, so no words are split between segments.
+    
+    Args:
+        pcm: 16 kHz mono PCM16 audio from decode_pcm16
+        
+    Returns:
+        List of PCM16 segments covering the whole recording
+    """
+    min_segment_bytes = MIN_SEGMENT_SECONDS * VAD_SAMPLE_RATE * 2
+    segments = []
+    start = 0
+    silent_frames = 0
+    
+    for offset in range(0, len(pcm) - VAD_FRAME_BYTES + 1, VAD_FRAME_BYTES):
+        if vad.is_speech(pcm[offset:offset + VAD_FRAME_BYTES], VAD_SAMPLE_RATE):
+            silent_frames = 0
+            continue
+        
+        silent_frames += 1
+        if silent_frames >= SEGMENT_SILENCE_FRAMES and offset - start >= min_segment_bytes:
+            cut = offset - (silent_frames // 2) * VAD_FRAME_BYTES
+            segments.append(pcm[start:cut])
+            start = cut
+            silent_frames = 0
+    
+    segments.append(pcm[start:])
+    return segments
+
+
+def transcribe_segments(client_id, segments):
+    """
+    Transcribe audio segments concurrently, emitting each one's text in order
+    
+    Args:
+        client_id: Client room to send transcription_partial events to
+        segments: PCM16 segments from split_on_silence
+        
+    Returns:
+        Full transcription
+    """
+    futures = [submit_segment(segment) for segment in segments]
+    return collect_transcriptions(client_id, futures)
+
+
+def submit_segment(segment):
+    """Start transcribing a 16 kHz PCM16 segment on the transcription pool, returning its future"""
+    return transcription_executor.submit(transcribe_audio, segment, 'pcm16', sample_rate=VAD_SAMPLE_RATE)
+
+
+def collect_transcriptions(client_id, futures):
+    """
+    Wait for segment transcriptions, emitting each one's text in order
+    
+    Args:
+        client_id: Client room to send transcription_partial events to
+        futures: Futures from submit_segment, in audio order
+        
+    Returns:
+        Full transcription
+    """
+    texts = []
+    try:
+        for future in futures:
+            # Blocking on the future directly would stall the whole eventlet hub
+            text = tpool.execute(future.result)
+            if text:
+                texts.append(text)
+            send_to_client(client_id, 'transcription_partial', {
+                'committed': text,
+                'text': ' '.join(texts),
+                'hypothesis': '',
+                'timestamp': time.time()
+            })
+    finally:
+        # Don't leave queued segments running after a failure
+        for future in futures:
+            future.cancel()
+    
+    return ' '.join(texts)
+
+
+def start_upload_stream(sample_rate):
+    """
+    Create the segmenting state for a Float32 chunked upload
+    
+    Args:
+        sample_rate: Sample rate of the uploaded Float32 PCM
+        
+    Returns:
+        Stream state dict for feed_upload_stream and finish_upload_stream
+    """
+    return {
+        'sample_rate': sample_rate,
+        'resampler': av.AudioResampler(format='s16', layout='mono', rate=VAD_SAMPLE_RATE),
+        'next_chunk': 0,  # First chunk index not yet fed to the segmenter
+        'carry': b'',  # Trailing bytes of a sample split across chunks
+        'pcm': bytearray(),  # 16 kHz PCM16 since the last cut
+        'scanned': 0,  # Bytes of pcm already run through VAD
+        'speech_frames': 0,
+        'silent_frames': 0,
+        'futures': []
+    }
+
+
+def feed_upload_stream(chunked_audio):
+    """
+    Segment newly arrived Float32 audio at pauses and start transcribing closed segments
+    
+    Chunks are consumed in index order, so out-of-order chunks wait until the
+    gap before them is filled.
+    
+    Args:
+        chunked_audio: The client's chunked upload state, holding a 'stream' from start_upload_stream
+    """
+    stream = chunked_audio['stream']
+    offsets = chunked_audio['offsets']
+    while stream['next_chunk'] < len(offsets) and offsets[stream['next_chunk']] is not None:
+        offset, length = offsets[stream['next_chunk']]
+        stream['next_chunk'] += 1
+        
+        data = stream['carry'] + os.pread(chunked_audio['fd'], length, offset)
+        usable = len(data) - len(data) % 4
+        stream['carry'] = data[usable:]
+        if not usable:
+            continue
+        
+        frame = av.AudioFrame.from_ndarray(
+            np.frombuffer(data[:usable], dtype=np.float32).reshape(1, -1), format='flt', layout='mono'
+        )
+        frame.sample_rate = stream['sample_rate']
+        for resampled in stream['resampler'].resample(frame):
+            stream['pcm'] += resampled.to_ndarray().tobytes()
+    
+    pcm = stream['pcm']
+    min_segment_bytes = MIN_STREAM_SEGMENT_SECONDS * VAD_SAMPLE_RATE * 2
+    while stream['scanned'] + VAD_FRAME_BYTES <= len(pcm):
+        offset = stream['scanned']
+        stream['scanned'] += VAD_FRAME_BYTES
+        if vad.is_speech(pcm[offset:offset + VAD_FRAME_BYTES], VAD_SAMPLE_RATE):
+            stream['speech_frames'] += 1
+            stream['silent_frames'] = 0
+            continue
+        
+        stream['silent_frames'] += 1
+        if (stream['silent_frames'] >= STREAM_SEGMENT_SILENCE_FRAMES
+                and stream['speech_frames'] >= VAD_MIN_SPEECH_FRAMES
+                and offset >= min_segment_bytes):
+            # Cut in the middle of the pause and start transcribing what came before it
+            cut = stream['scanned'] - (stream['silent_frames'] // 2) * VAD_FRAME_BYTES
+            stream['futures'].append(submit_segment(bytes(pcm[:cut])))
+            del pcm[:cut]
+            stream['scanned'] -= cut
+            stream['speech_frames'] = 0
+            stream['silent_frames'] = 0
+
+
+def finish_upload_stream(stream):
+    """
+    Submit the audio after the last pause of a completed Float32 upload
+    
+    Args:
+        stream: Stream state from start_upload_stream
+        
+    Returns:
+        Futures for every segment containing speech, in audio order; empty if there was none
+    """
+    for resampled in stream['resampler'].resample(None):
+        stream['pcm'] += resampled.to_ndarray().tobytes()
+    
+    # The VAD pass covers everything after the last pause, so it runs off the hub
+    if tpool.execute(contains_speech, stream['pcm']):
+        stream['futures'].append(submit_segment(bytes(stream['pcm'])))
+    stream['pcm'] = bytearray()
+    return stream['futures']
+
+
+def cancel_upload_stream(stream):
+    """Cancel segment transcriptions of an upload that will never be processed"""
+    if stream:
+        for future in stream['futures']:
+            future.cancel()
+
+
+def transcribe_upload(audio_data, audio_file, file_format, sample_rate):
+    """
+    Transcribe an upload held in memory or on disk
+    
+    Whisper accepts WAV directly, so WAV is only re-encoded to MP3 when the
+    API actually rejects it (e.g. an unusual sample format).
+    
+    Args:
+        audio_data: Audio bytes, or None if the upload is on disk
+        audio_file: Binary file object holding the upload when audio_data is None
+        file_format: Normalized audio format
+        sample_rate: Sample rate of raw 'f32' audio
+        
+    Returns:
+        Transcribed text
+    """
+    try:
+        if audio_data is None:
+            audio_file.seek(0)
+            return transcribe_audio(audio_file, file_format)
+        return transcribe_audio(audio_data, file_format, sample_rate=sample_rate)
+    except Exception as e:
+        if file_format != 'wav':
+            raise
+        logger.warning(f"Whisper rejected WAV audio, retrying as MP3: {str(e)}")
+        
+        if audio_data is None:
+            audio_file.seek(0)
+            audio_data = audio_file.read()
+        mp3_data = convert_wav_to_mp3(audio_data)
+        if not mp3_data:
+            raise
+        return transcribe_audio(mp3_data, 'mp3')
+
+
+def convert_wav_to_mp3(audio_data):
+    """Re-encode WAV audio to MP3 in memory with PyAV, returning None if the conversion fails"""
+    try:
+        mp3_file = BytesIO()
+        with av.open(BytesIO(audio_data)) as wav_container, av.open(mp3_file, mode='w', format='mp3') as mp3_container:
+            wav_stream = wav_container.streams.audio[0]
+            mp3_stream = mp3_container.add_stream('mp3', rate=wav_stream.rate)
+            
+            for frame in wav_container.decode(wav_stream):
+                mp3_container.mux(mp3_stream.encode(frame))
+            
+            # Flush the encoder
+            mp3_container.mux(mp3_stream.encode(None))
+        
+        mp3_data = mp3_file.getvalue()
+        logger.info("Converted WAV to MP3: %s -> %s bytes", len(audio_data), len(mp3_data))
+        return mp3_data
+    except Exception as convert_error:
+        logger.warning(f"Failed to convert WAV to MP3: {str(convert_error)}")
+        return None
+
+
+def cork_client_socket():
+    """
+    Set TCP_CORK on the current client's connection so a burst of emits is coalesced
+    
+    Only works in a handler's request context on eventlet, where the raw socket is
+    reachable through the WSGI environ; elsewhere this is a no-op.
+    
+    Returns:
+        The corked socket to pass to uncork_client_socket, or None
+    """
+    if not hasattr(socket, 'TCP_CORK'):
+        return None
+    try:
+        sock = request.environ['eventlet.input'].get_socket()
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_CORK, 1)
+        return sock
+    except (KeyError, AttributeError, OSError):
+        return None
+
+
+def uncork_client_socket(sock):
+    """Flush queued emits and clear TCP_CORK on a socket from cork_client_socket"""
+    if sock is None:
+        return
+    # Let engineio's writer greenlet hand the queued packets to the corked socket first
+    socketio.sleep(0)
+    try:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_CORK, 0)
+    except OSError:
+        pass
+
+
+def normalize_file_format(file_format):
+    """Map a client-reported audio format onto one the pipeline handles, defaulting to webm"""
+    return file_format if file_format in ('m4a', 'mp3', 'wav', 'f32') else 'webm'
+
+
+def open_upload_file():
+    """
+    Open an anonymous temp file for chunked uploads
+    
+    On Linux O_TMPFILE creates the inode with no directory entry at all, so it
+    vanishes when the descriptor is closed. Elsewhere a named temp file is
+    unlinked straight after creation for the same effect.
+    
+    Returns:
+        Read/write file descriptor
+    """
+    if hasattr(os, 'O_TMPFILE'):
+        try:
+            return os.open(tempfile.gettempdir(), os.O_TMPFILE | os.O_RDWR, 0o600)
+        except OSError:
+            # Filesystem without O_TMPFILE support, e.g. some overlay or network mounts
+            pass
+    audio_fd, audio_path = tempfile.mkstemp()
+    os.unlink(audio_path)
+    return audio_fd
+
+
+def close_upload_file(audio_fd):
+    """Close an upload file descriptor, ignoring one that is missing or already closed"""
+    if audio_fd is None:
+        return
+    try:
+        os.close(audio_fd)
+    except OSError:
+        pass
+
+
+def release_upload_file(client_id, audio_fd):
+    """Give a processed upload file back to its client for reuse, or close it if it isn't needed"""
+    client_info = connected_clients.get(client_id)
+    if client_info and client_info.upload_fd is None:
+        client_info.upload_fd = audio_fd
+    else:
+        close_upload_file(audio_fd)
+
+
+def discard_audio_files(client_info):
+    """Drop a client's partial chunked upload and any unprocessed upload, keeping the file for reuse"""
+    cancel_upload_stream(client_info.chunked_audio and client_info.chunked_audio.get('stream'))
+    cancel_upload_stream(client_info.upload_stream)
+    client_info.upload_stream = None
+    for audio_fd in (client_info.chunked_audio and client_info.chunked_audio['fd'], client_info.audio_fd):
+        if audio_fd is None:
+            continue
+        if client_info.upload_fd is None:
+            client_info.upload_fd = audio_fd
+        else:
+            close_upload_file(audio_fd)
+    client_info.chunked_audio = None
+    client_info.audio_fd = None
+
+
+def trim_history(history):
+    """
+    Drop the oldest exchanges in place once history passes MAX_HISTORY_TURNS
+    
+    The system message and the last MIN_HISTORY_TURNS exchanges are kept. Between
+    trims the list is only appended to, so consecutive prompts share their prefix.
+    """
+    if len(history) > 1 + 2 * MAX_HISTORY_TURNS:
+        del history[1:-2 * MIN_HISTORY_TURNS]
+    
+    # A few very long exchanges can still exceed the token budget; summarize them away
+    keep = 2 * SUMMARY_KEEP_TURNS
+    kept_from = max(1, len(history) - keep)
+    threshold = SUMMARY_THRESHOLD * HISTORY_TOKEN_BUDGET
+    
+    # If the kept exchanges alone are over the threshold, no summary can bring the total
+    # under it; cut the long kept messages instead of re-summarizing on every turn. Each
+    # message is cut at most once, and only among the last few exchanges, so the earlier
+    # prefix holds.
+    if sum(map(estimate_tokens, history[kept_from:])) > threshold:
+        for index in range(kept_from, len(history)):
+            message = history[index]
+            if len(message['content']) > KEPT_MESSAGE_CHARS:
+                # Replaced rather than edited, since a queued session_store write may hold it
+                content = message['content'][:KEPT_MESSAGE_CHARS].rsplit(' ', 1)[0] + '...'
+                history[index] = {**message, 'content': content}
+    
+    if len(history) <= 1 + keep or sum(map(estimate_tokens, history)) <= threshold:
+        return
+    
+    # With a summary already in place, wait until enough new exchanges have built up
+    # behind it (or the whole budget is used) before rebuilding it, so the prefix isn't
+    # rewritten every turn
+    first = 1
+    if history[1]['role'] == 'system' and history[1]['content'].startswith(SUMMARY_PREFIX):
+        first = 2
+        if (sum(map(estimate_tokens, history[first:-keep])) < SUMMARY_REBUILD_TOKENS
+                and sum(map(estimate_tokens, history)) <= HISTORY_TOKEN_BUDGET):
+            return
+    if len(history) > first + keep:
+        history[1:-keep] = [heuristic_summary(history[1:-keep])]
+
+
+def estimate_tokens(message):
+    """Rough token count of a chat message, at about four characters per token"""
+    return (len(message['content']) + len(message.get('name', ''))) // 4
+
+
+def heuristic_summary(messages):
+    """
+    Fold chat messages into a single system message without calling the model
+    
+    Args:
+        messages: Messages to summarize, which may start with an earlier summary
+        
+    Returns:
+        System message with each message's role and truncated content, one per line
+    """
+    lines = []
+    for message in messages:
+        content = message['content']
+        if message['role'] == 'system' and content.startswith(SUMMARY_PREFIX):
+            lines.append(content[len(SUMMARY_PREFIX):])
+            continue
+        if len(content) > SUMMARY_MESSAGE_CHARS:
+            content = content[:SUMMARY_MESSAGE_CHARS].rsplit(' ', 1)[0] + '...'
+        lines.append(f"{message['role'].capitalize()}: {content}")
+    
+    # Keep the summary itself to half the budget, dropping its oldest lines first
+    summary = '\n'.join(lines)
+    max_chars = HISTORY_TOKEN_BUDGET * 2
+    if len(summary) > max_chars:
+        summary = summary[-max_chars:].split('\n', 1)[-1]
+    return {"role": "system", "content": SUMMARY_PREFIX + summary}
+
+
+def check_openai_available():
+    """Probe the OpenAI API, reusing the result for OPENAI_HEALTH_TTL_SECONDS"""
+    available = openai_health_cache.get('openai')
+    if available is None:
+        # Concurrent health checks wait for one probe instead of each sending their own
+        with openai_health_lock:
+            available = openai_health_cache.get('openai')
+            if available is None:
+                try:
+                    # Off the hub, so a slow probe doesn't stall other clients
+                    tpool.execute(get_client().models.list, limit=1)
+                    available = True
+                except Exception:
+                    available = False
+                openai_health_cache['openai'] = available
+    return available
+
+
+def decode_audio_payload(payload):
+    """
+    Get raw audio bytes from a Socket.IO payload
+    
+    Binary frames arrive as bytes; older clients still send base64 strings.
+    
+    Args:
+        payload: Audio as bytes-like data or a base64 string
+        
+    Returns:
+        Audio bytes
+        
+    Raises:
+        ValueError: If a base64 string is malformed
+    """
+    if isinstance(payload, str):
+        # pybase64's SIMD decoder is several times faster than the stdlib on multi-MB audio,
+        # and validates in the same pass so garbage is rejected on arrival
+        return pybase64.b64decode(payload, validate=True)
+    return payload if isinstance(payload, (bytes, bytearray)) else bytes(payload)
 
 
 @socketio.on('text_message')
-def handle_text_message(data):
+@with_client
+def handle_text_message(client_id, client_info, data):
     """Handle text message from client (for testing without audio)"""
-    client_id = request.sid
-    logger.info(f"Received text message from client: {client_id}")
+    logger.info("Received text message from client: %s", client_id)
     
     try:
         # Update last activity timestamp
-        if client_id in connected_clients:
-            connected_clients[client_id]['last_activity'] = time.time()
+        client_info.last_activity = time.monotonic_ns()
         
         # Validate data
         if 'text' not in data:
             emit('error', {
-                'type': ErrorTypes.VALIDATION_ERROR.value,
+                'type': ERR_VALIDATION,
                 'message': 'Missing text in request'
             })
             return
         
         text = data['text']
-        logger.info(f"Text message: {text}")
+        binary_audio = data.get('binary_audio', False)  # Stream audio as binary frames after the text
+        logger.info("Text message: %s", text)
         
-        # Get client info
-        client_info = connected_clients.get(client_id)
-        if not client_info:
-            logger.error(f"Client info not found: {client_id}")
+        # Check if already processing
+        if client_info.is_processing:
             emit('error', {
-                'type': ErrorTypes.AUTH_ERROR.value,
-                'message': 'Client session not found',
-                'reconnect': True
+                'type': ERR_PROCESSING,
+                'message': 'Already processing request'
             })
             return
         
-        # Check if already processing
-        if client_info['is_processing']:
+        if not pipeline_semaphore.acquire(blocking=False):
+            logger.warning(f"Rejecting text message from {client_id}: {MAX_INFLIGHT_PIPELINES} pipelines in flight")
             emit('error', {
-                'type': ErrorTypes.PROCESSING_ERROR.value,
-                'message': 'Already processing request'
+                'type': ERR_PROCESSING,
+                'message': 'Server busy, retry',
+                'retry_after': PIPELINE_RETRY_AFTER_SECONDS
             })
             return
         
         # Mark client as processing
-        client_info['is_processing'] = True
+        client_info.is_processing = True
         
         try:
             # 1. Add user message to conversation history
-            client_info['conversation_history'].append({
+            client_info.conversation_history.append({
                 "role": "user",
                 "content": text
             })
             
             # 2. Process with LLM
-            client_info['current_stage'] = PipelineStage.PROCESSING.value
-            emit('processing_status', {
-                'status': 'processing',
-                'message': 'Generating response',
-                'stage': 'llm',
-                'timestamp': time.time()
-            })
+            client_info.current_stage = STAGE_PROCESSING
+            send_to_client(client_id, 'processing_status', status_payload(STATUS_GENERATING_RESPONSE))
             
             try:
                 # Generate response
-                response_text = generate_chat_response(client_info['conversation_history'])
-                logger.info(f"Response: {response_text}")
+                response_text = tpool.execute(generate_chat_response, client_info.conversation_history)
+                logger.info("Response: %s", response_text)
                 
                 # Add assistant response to conversation history
-                client_info['conversation_history'].append({
+                client_info.conversation_history.append({
                     "role": "assistant",
                     "content": response_text
                 })
+                store_in_background(session_store.save_turn, client_id, *client_info.conversation_history[-2:])
+                trim_history(client_info.conversation_history)
             except Exception as llm_error:
-                logger.error(f"LLM processing error: {str(llm_error)}")
+                # Logged with its traceback once, by the outer handler
                 emit('error', {
-                    'type': ErrorTypes.API_ERROR.value,
+                    'type': ERR_API,
                     'message': 'Failed to generate response',
                     'details': str(llm_error),
                     'stage': 'llm'
                 })
                 raise
             
-            # 3. Convert to speech
-            client_info['current_stage'] = PipelineStage.GENERATING_SPEECH.value
-            emit('processing_status', {
-                'status': 'processing',
-                'message': 'Converting to speech',
-                'stage': 'tts',
-                'timestamp': time.time()
-            })
+            # 3. Convert to speech (binary clients get it after the text response)
+            client_info.current_stage = STAGE_GENERATING_SPEECH
+            send_to_client(client_id, 'processing_status', status_payload(STATUS_CONVERTING_SPEECH))
             
             try:
-                audio_base64 = generate_speech(response_text)
+                audio_base64 = None if binary_audio else synthesize_speech(response_text, response_format=LEGACY_AUDIO_FORMAT)
             except Exception as tts_error:
-                logger.error(f"TTS error: {str(tts_error)}")
+                logger.exception(f"TTS error: {str(tts_error)}")
                 emit('error', {
-                    'type': ErrorTypes.API_ERROR.value,
+                    'type': ERR_API,
                     'message': 'Failed to convert text to speech',
                     'details': str(tts_error),
                     'stage': 'tts',
@@ -801,51 +1895,59 @@ def handle_text_message(data):
                 audio_base64 = None
             
             # 4. Send response to client
-            client_info['current_stage'] = PipelineStage.SENDING.value
-            emit('response', {
+            client_info.current_stage = STAGE_SENDING
+            send_to_client(client_id, 'response', {
                 'text': response_text,
                 'audio': audio_base64,
-                'type': 'voice' if audio_base64 else 'text',
+                'type': 'voice' if audio_base64 or binary_audio else 'text',
+                'audio_transport': 'binary' if binary_audio else 'base64',
                 'timestamp': time.time()
             })
             
+            # 5. Stream speech as raw binary frames, skipping base64 and JSON string escaping
+            if binary_audio:
+                try:
+                    stream_speech_to_client(response_text, TTS_DEFAULT_VOICE, client_id, TTS_DEFAULT_FORMAT)
+                except Exception as tts_error:
+                    logger.exception(f"Error streaming speech: {str(tts_error)}")
+                    emit('error', {
+                        'type': ERR_API,
+                        'message': 'Failed to convert text to speech',
+                        'details': str(tts_error),
+                        'stage': 'tts'
+                    })
+            
             # Set stage back to idle
-            client_info['current_stage'] = PipelineStage.IDLE.value
+            client_info.current_stage = STAGE_IDLE
             
-            # Keep only last 10 messages in conversation history to prevent context overflow
-            if len(client_info['conversation_history']) > 12:  # system + 5 turns (10 messages)
-                client_info['conversation_history'] = client_info['conversation_history'][:1] + client_info['conversation_history'][-10:]
-                
             # Send final status update
-            emit('processing_status', {
-                'status': 'completed',
-                'message': 'Processing completed successfully',
-                'stage': 'completed',
-                'timestamp': time.time()
-            })
+            send_to_client(client_id, 'processing_status', status_payload(STATUS_COMPLETED))
         finally:
             # Reset processing state
-            client_info['is_processing'] = False
+            client_info.is_processing = False
+            pipeline_semaphore.release()
     
     except Exception as e:
-        logger.error(f"Error handling text message: {str(e)}")
-        logger.error(traceback.format_exc())
+        logger.exception(f"Error handling text message: {str(e)}")
         emit('error', {
-            'type': ErrorTypes.PROCESSING_ERROR.value,
+            'type': ERR_PROCESSING,
             'message': f'Error handling text message: {str(e)}',
             'recoverable': True
         })
         
         # Reset processing state
-        if client_id in connected_clients:
-            connected_clients[client_id]['is_processing'] = False
-            connected_clients[client_id]['current_stage'] = PipelineStage.IDLE.value
+        client_info.is_processing = False
+        client_info.current_stage = STAGE_IDLE
 
 
 @socketio.on('error')
-def handle_error(error_data):
+@with_optional_client
+def handle_error(client_id, client_info, error_data):
     """Handle error messages from client"""
-    client_id = request.sid
+    # Reports past the client's rate limit are dropped unlogged
+    if client_info and not take_event_token(client_info):
+        return
+    
     logger.error(f"Error from client {client_id}: {error_data}")
     
     try:
@@ -857,44 +1959,40 @@ def handle_error(error_data):
         logger.error(f"Client error - Type: {error_type}, Message: {error_message}, Details: {error_details}")
         
         # Update client state if needed
-        if client_id in connected_clients:
+        if client_info:
             # Reset processing flag if client reports error during processing
-            if error_type == 'processing_error' and connected_clients[client_id]['is_processing']:
-                connected_clients[client_id]['is_processing'] = False
+            if error_type == 'processing_error' and client_info.is_processing:
+                client_info.is_processing = False
             
             # Update last activity
-            connected_clients[client_id]['last_activity'] = time.time()
+            client_info.last_activity = time.monotonic_ns()
     
     except Exception as e:
-        logger.error(f"Error handling client error message: {str(e)}")
-        logger.error(traceback.format_exc())
+        logger.exception(f"Error handling client error message: {str(e)}")
 
 
 # Health check event
 @socketio.on('health_check')
-def handle_health_check():
+@with_optional_client
+def handle_health_check(client_id, client_info):
     """Handle health check requests"""
-    client_id = request.sid
-    
     try:
         # Verify client exists
-        if client_id not in connected_clients:
+        if not client_info:
             emit('health_response', {
                 'status': 'error',
                 'message': 'Client session not found'
             })
             return
         
+        if not take_event_token(client_info):
+            return
+        
         # Update last activity
-        connected_clients[client_id]['last_activity'] = time.time()
+        now = client_info.last_activity = time.monotonic_ns()
         
         # Basic service status
-        openai_available = True
-        try:
-            # Simple check that client is initialized
-            client.models.list(limit=1)
-        except Exception:
-            openai_available = False
+        openai_available = check_openai_available()
         
         # Send health status
         emit('health_response', {
@@ -906,14 +2004,13 @@ def handle_health_check():
                 'audio_processing': True
             },
             'client_info': {
-                'session_duration': time.time() - connected_clients[client_id]['connection_time'],
-                'conversation_turns': len(connected_clients[client_id]['conversation_history']) - 1 if connected_clients[client_id]['conversation_history'] else 0
+                'session_duration': (now - client_info.connection_time) / 1e9,
+                'conversation_turns': len(client_info.conversation_history) - 1 if client_info.conversation_history else 0
             }
         })
     
     except Exception as e:
-        logger.error(f"Error handling health check: {str(e)}")
-        logger.error(traceback.format_exc())
+        logger.exception(f"Error handling health check: {str(e)}")
         emit('health_response', {
             'status': 'error',
             'message': str(e)
@@ -922,32 +2019,28 @@ def handle_health_check():
 
 # Add WebRTC signaling events
 @socketio.on('webrtc_offer')
-def handle_webrtc_offer(data):
+@with_optional_client
+def handle_webrtc_offer(client_id, client_info, data):
     """Handle WebRTC offer from client and forward to the target client"""
-    client_id = request.sid
-    logger.info(f"WebRTC offer from client: {client_id}")
+    logger.info("WebRTC offer from client: %s", client_id)
     
     try:
         # Update last activity timestamp
-        if client_id in connected_clients:
-            connected_clients[client_id]['last_activity'] = time.time()
+        if client_info:
+            client_info.last_activity = time.monotonic_ns()
         
-        # Validate data
-        if 'target' not in data or 'sdp' not in data:
-            emit('error', {
-                'type': ErrorTypes.VALIDATION_ERROR.value,
-                'message': 'Missing target or SDP in offer request'
-            })
+        # Validate data, fetching each field with a single lookup
+        target_client_id = data.get('target')
+        sdp_offer = data.get('sdp')
+        if target_client_id is None or sdp_offer is None:
+            emit('error', MISSING_OFFER_FIELDS_ERROR)
             return
         
-        target_client_id = data['target']
-        sdp_offer = data['sdp']
-        
         # If target is 'server', handle it directly
-        if target_client_id == 'server':
+        if target_client_id in SERVER_TARGETS:
             # Mark client as using WebRTC
-            if client_id in connected_clients:
-                connected_clients[client_id]['using_webrtc'] = True
+            if client_info:
+                client_info.using_webrtc = True
             
             # For demo/testing purposes, just acknowledge the offer
             # In a real implementation, we would create a proper SDP answer here
@@ -955,145 +2048,139 @@ def handle_webrtc_offer(data):
                 'status': 'success',
                 'message': 'WebRTC offer acknowledged'
             })
-            logger.info(f"WebRTC offer received from {client_id} and acknowledged by server")
+            logger.info("WebRTC offer received from %s and acknowledged by server", client_id)
             return
         
         # Check if target client exists
         if target_client_id not in connected_clients:
-            emit('error', {
-                'type': ErrorTypes.VALIDATION_ERROR.value,
-                'message': 'Target client not found or not connected'
-            })
+            emit('error', TARGET_NOT_FOUND_ERROR)
             return
         
-        # Forward offer to target client
-        emit('webrtc_offer', {
-            'from': client_id,
-            'sdp': sdp_offer
-        }, room=target_client_id)
+        # Forward offer to target client, reusing the decoded request dict as the payload
+        data.clear()
+        data['from'] = client_id
+        data['sdp'] = sdp_offer
+        emit('webrtc_offer', data, room=target_client_id)
         
-        logger.info(f"WebRTC offer forwarded from {client_id} to {target_client_id}")
+        logger.info("WebRTC offer forwarded from %s to %s", client_id, target_client_id)
     
     except Exception as e:
-        logger.error(f"Error handling WebRTC offer: {str(e)}")
-        logger.error(traceback.format_exc())
+        logger.exception(f"Error handling WebRTC offer: {str(e)}")
         emit('error', {
-            'type': ErrorTypes.PROCESSING_ERROR.value,
+            'type': ERR_PROCESSING,
             'message': f'Error handling WebRTC offer: {str(e)}'
         })
 
 
 @socketio.on('webrtc_answer')
-def handle_webrtc_answer(data):
+@with_optional_client
+def handle_webrtc_answer(client_id, client_info, data):
     """Handle WebRTC answer from client and forward to the target client"""
-    client_id = request.sid
-    logger.info(f"WebRTC answer from client: {client_id}")
+    logger.info("WebRTC answer from client: %s", client_id)
     
     try:
         # Update last activity timestamp
-        if client_id in connected_clients:
-            connected_clients[client_id]['last_activity'] = time.time()
+        if client_info:
+            client_info.last_activity = time.monotonic_ns()
         
-        # Validate data
-        if 'target' not in data or 'sdp' not in data:
-            emit('error', {
-                'type': ErrorTypes.VALIDATION_ERROR.value,
-                'message': 'Missing target or SDP in answer request'
-            })
+        # Validate data, fetching each field with a single lookup
+        target_client_id = data.get('target')
+        sdp_answer = data.get('sdp')
+        if target_client_id is None or sdp_answer is None:
+            emit('error', MISSING_ANSWER_FIELDS_ERROR)
             return
         
-        target_client_id = data['target']
-        sdp_answer = data['sdp']
-        
         # Check if target client exists
         if target_client_id not in connected_clients:
-            emit('error', {
-                'type': ErrorTypes.VALIDATION_ERROR.value,
-                'message': 'Target client not found or not connected'
-            })
+            emit('error', TARGET_NOT_FOUND_ERROR)
             return
         
-        # Forward answer to target client
-        emit('webrtc_answer', {
-            'from': client_id,
-            'sdp': sdp_answer
-        }, room=target_client_id)
+        # Forward answer to target client, reusing the decoded request dict as the payload
+        data.clear()
+        data['from'] = client_id
+        data['sdp'] = sdp_answer
+        emit('webrtc_answer', data, room=target_client_id)
         
-        logger.info(f"WebRTC answer forwarded from {client_id} to {target_client_id}")
+        logger.info("WebRTC answer forwarded from %s to %s", client_id, target_client_id)
     
     except Exception as e:
-        logger.error(f"Error handling WebRTC answer: {str(e)}")
-        logger.error(traceback.format_exc())
+        logger.exception(f"Error handling WebRTC answer: {str(e)}")
         emit('error', {
-            'type': ErrorTypes.PROCESSING_ERROR.value,
+            'type': ERR_PROCESSING,
             'message': f'Error handling WebRTC answer: {str(e)}'
         })
 
 
 @socketio.on('webrtc_ice_candidate')
-def handle_ice_candidate(data):
+@with_optional_client
+def handle_ice_candidate(client_id, client_info, data):
     """Handle ICE candidate from client and forward to the target client"""
-    client_id = request.sid
-    logger.debug(f"ICE candidate from client: {client_id}")
+    debug = logger.isEnabledFor(logging.DEBUG)
+    if debug:
+        logger.debug("ICE candidate from client: %s", client_id)
     
     try:
         # Update last activity timestamp
-        if client_id in connected_clients:
-            connected_clients[client_id]['last_activity'] = time.time()
+        if client_info:
+            client_info.last_activity = time.monotonic_ns()
         
-        # Validate data
-        if 'target' not in data or 'candidate' not in data:
-            emit('error', {
-                'type': ErrorTypes.VALIDATION_ERROR.value,
-                'message': 'Missing target or candidate in ICE request'
-            })
+        # Validate data, fetching each field with a single lookup
+        target_client_id = data.get('target')
+        ice_candidate = data.get('candidate')
+        if target_client_id is None or ice_candidate is None:
+            emit('error', MISSING_ICE_FIELDS_ERROR)
             return
         
-        target_client_id = data['target']
-        ice_candidate = data['candidate']
-        
         # If target is 'server', just acknowledge it
-        if target_client_id == 'server':
+        if target_client_id in SERVER_TARGETS:
             # Just acknowledge the ICE candidate without forwarding
-            logger.debug(f"ICE candidate received from {client_id} for server (acknowledged)")
+            if debug:
+                logger.debug("ICE candidate received from %s for server (acknowledged)", client_id)
             return
         
-        # Check if target client exists
-        if target_client_id not in connected_clients:
-            emit('error', {
-                'type': ErrorTypes.VALIDATION_ERROR.value,
-                'message': 'Target client not found or not connected'
-            })
+        # Check if target client exists, keeping its session for the send below
+        target_info = connected_clients.get(target_client_id)
+        if target_info is None:
+            emit('error', TARGET_NOT_FOUND_ERROR)
             return
         
-        # Forward ICE candidate to target client
-        emit('webrtc_ice_candidate', {
-            'from': client_id,
-            'candidate': ice_candidate
-        }, room=target_client_id)
+        # Forward ICE candidate to target client, reusing the decoded request dict as the payload.
+        # Targets that accept batched events get trickled candidates merged into `batch` frames.
+        data.clear()
+        data['from'] = client_id
+        data['candidate'] = ice_candidate
+        send_to_session(target_client_id, target_info, 'webrtc_ice_candidate', data)
         
-        logger.debug(f"ICE candidate forwarded from {client_id} to {target_client_id}")
+        if debug:
+            logger.debug("ICE candidate forwarded from %s to %s", client_id, target_client_id)
     
     except Exception as e:
-        logger.error(f"Error handling ICE candidate: {str(e)}")
-        logger.error(traceback.format_exc())
+        logger.exception(f"Error handling ICE candidate: {str(e)}")
         emit('error', {
-            'type': ErrorTypes.PROCESSING_ERROR.value,
+            'type': ERR_PROCESSING,
             'message': f'Error handling ICE candidate: {str(e)}'
         })
 
 
 @socketio.on('webrtc_stream_ready')
-def handle_stream_ready(data):
+@with_client
+def handle_stream_ready(client_id, client_info, data):
     """Handle client notification that stream is ready for processing"""
-    client_id = request.sid
-    logger.info(f"WebRTC stream ready from client: {client_id}")
+    logger.info("WebRTC stream ready from client: %s", client_id)
     
     try:
         # Update last activity timestamp
-        if client_id in connected_clients:
-            connected_clients[client_id]['last_activity'] = time.time()
-            connected_clients[client_id]['using_webrtc'] = True
+        client_info.last_activity = time.monotonic_ns()
+        client_info.using_webrtc = True
+        # Start a fresh streaming transcription; the model is loaded off the event loop
+        try:
+            client_info.stream_transcriber = tpool.execute(StreamingTranscriber)
+        except WhisperUnavailableError as e:
+            emit('webrtc_stream_ready_ack', {
+                'status': 'unavailable',
+                'message': str(e)
+            })
+            return
         
         # Acknowledge stream ready
         emit('webrtc_stream_ready_ack', {
@@ -1102,94 +2189,131 @@ def handle_stream_ready(data):
         })
         
     except Exception as e:
-        logger.error(f"Error handling WebRTC stream ready: {str(e)}")
-        logger.error(traceback.format_exc())
+        logger.exception(f"Error handling WebRTC stream ready: {str(e)}")
         emit('error', {
-            'type': ErrorTypes.PROCESSING_ERROR.value,
+            'type': ERR_PROCESSING,
             'message': f'Error handling WebRTC stream ready: {str(e)}'
         })
 
 
 @socketio.on('webrtc_stream_chunk')
-def handle_stream_chunk(data):
+@with_client
+def handle_stream_chunk(client_id, client_info, data):
     """Handle audio chunk from WebRTC stream for real-time processing"""
-    client_id = request.sid
-    logger.debug(f"WebRTC stream chunk from client: {client_id}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("WebRTC stream chunk from client: %s", client_id)
     
     try:
-        # Get client info
-        client_info = connected_clients.get(client_id)
-        if not client_info:
-            logger.error(f"Client info not found: {client_id}")
-            emit('error', {
-                'type': ErrorTypes.AUTH_ERROR.value,
-                'message': 'Client session not found',
-                'reconnect': True
-            })
-            return
+        # Update last activity timestamp
+        client_info.last_activity = time.monotonic_ns()
         
-        # Validate data
-        if 'audio_data' not in data:
+        # Validate data, fetching the field with a single lookup
+        audio_payload = data.get('audio_data')
+        if audio_payload is None:
             emit('error', {
-                'type': ErrorTypes.VALIDATION_ERROR.value,
+                'type': ERR_VALIDATION,
                 'message': 'Missing audio_data in WebRTC chunk'
             })
             return
             
-        # Process the audio chunk
-        # This will need to be implemented as part of the VAD system in BD4
-        # For now, we'll just acknowledge receipt
+        transcriber = client_info.stream_transcriber
+        if not transcriber:
+            emit('error', {
+                'type': ERR_VALIDATION,
+                'message': 'WebRTC stream not started'
+            })
+            return
+        
+        # Chunks are mono Float32 PCM at 16 kHz, as raw bytes or base64
+        audio_data = decode_audio_payload(audio_payload)
+        transcriber.insert_audio(np.frombuffer(audio_data, dtype=np.float32))
+        
         emit('webrtc_chunk_received', {
             'status': 'success',
             'timestamp': time.time()
         })
         
+        # Transcribe in a native thread so the Whisper encoder doesn't block other clients.
+        # Handlers run in their own greenlets, so skip this chunk's round while one is running;
+        # its audio is picked up by the next round.
+        if transcriber.claim_round():
+            committed, hypothesis = tpool.execute(transcriber.process)
+            send_to_client(client_id, 'transcription_partial', {
+                'committed': committed,
+                'text': transcriber.committed_text,
+                'hypothesis': hypothesis,
+                'timestamp': time.time()
+            })
+        
     except Exception as e:
-        logger.error(f"Error handling WebRTC stream chunk: {str(e)}")
-        logger.error(traceback.format_exc())
+        logger.exception(f"Error handling WebRTC stream chunk: {str(e)}")
         emit('error', {
-            'type': ErrorTypes.PROCESSING_ERROR.value,
+            'type': ERR_PROCESSING,
             'message': f'Error handling WebRTC stream chunk: {str(e)}'
         })
 
 
+@socketio.on('webrtc_stream_end')
+@with_client
+def handle_stream_end(client_id, client_info, data=None):
+    """Handle the end of a WebRTC stream by flushing its streaming transcription"""
+    logger.info("WebRTC stream ended from client: %s", client_id)
+    
+    try:
+        client_info.last_activity = time.monotonic_ns()
+        transcriber = client_info.stream_transcriber
+        client_info.stream_transcriber = None
+        if not transcriber:
+            emit('error', {
+                'type': ERR_VALIDATION,
+                'message': 'WebRTC stream not started'
+            })
+            return
+        
+        transcription = tpool.execute(transcriber.finish)
+        logger.info("Streaming transcription: %s", transcription)
+        
+        # Same event as the batch pipeline, so clients continue with process_transcription
+        send_to_client(client_id, 'transcription', {
+            'text': transcription,
+            'final': True,
+            'timestamp': time.time()
+        })
+        
+    except Exception as e:
+        logger.exception(f"Error handling WebRTC stream end: {str(e)}")
+        emit('error', {
+            'type': ERR_API,
+            'message': f'Error finishing streaming transcription: {str(e)}',
+            'stage': STAGE_TRANSCRIBING
+        })
+
+
 @socketio.on('process_audio')
-def handle_process_audio(data=None):
+@with_client
+def handle_process_audio(client_id, client_info, data=None):
     """Handle manual request to process audio"""
-    client_id = request.sid
-    logger.info(f"Manual processing audio request from client: {client_id}")
+    logger.info("Manual processing audio request from client: %s", client_id)
     
     # Update last activity timestamp
-    if client_id in connected_clients:
-        connected_clients[client_id]['last_activity'] = time.time()
+    client_info.last_activity = time.monotonic_ns()
     
     # Call the process_audio function with the client ID
-    process_audio(client_id)
+    socketio.start_background_task(process_audio, client_id)
 
 
 @socketio.on('process_transcription')
-def handle_process_transcription(data):
+@with_client
+def handle_process_transcription(client_id, client_info, data):
     """Handle request to process transcription text with LLM"""
-    client_id = request.sid
-    logger.info(f"Processing transcription request from client: {client_id}")
+    logger.info("Processing transcription request from client: %s", client_id)
     
     try:
-        # Get client info
-        client_info = connected_clients.get(client_id)
-        if not client_info:
-            logger.error(f"Client info not found: {client_id}")
-            emit('error', {
-                'type': ErrorTypes.AUTH_ERROR.value,
-                'message': 'Client session not found',
-                'reconnect': True
-            }, room=client_id)
-            return
-        
         # Check if already processing
-        if client_info.get('is_processing'):
+        if client_info.is_processing:
             logger.warning(f"Client {client_id} is already processing a request")
             emit('error', {
-                'type': ErrorTypes.PROCESSING_ERROR.value,
+                'type': ERR_PROCESSING,
                 'message': 'Already processing a request'
             }, room=client_id)
             return
@@ -1198,7 +2322,7 @@ def handle_process_transcription(data):
         if not data or 'text' not in data:
             logger.error(f"Missing transcription text in request from {client_id}")
             emit('error', {
-                'type': ErrorTypes.VALIDATION_ERROR.value,
+                'type': ERR_VALIDATION,
                 'message': 'Missing transcription text in request'
             }, room=client_id)
             return
@@ -1206,85 +2330,149 @@ def handle_process_transcription(data):
         transcription_text = data['text']
         voice_preference = data.get('voice', 'alloy')  # Default to 'alloy' voice
         should_generate_speech = data.get('generate_speech', True)  # Default to generating speech
+        binary_audio = data.get('binary_audio', False)  # Stream audio as binary frames after the text
+        deferred_audio = data.get('deferred_audio', False)  # Send base64 audio in a later response_speech event
+        stream_response = data.get('stream_response', False)  # Send the reply sentence by sentence as response_chunk events
+        audio_format = data.get('audio_format', TTS_DEFAULT_FORMAT if binary_audio else LEGACY_AUDIO_FORMAT)
+        if audio_format not in TTS_FORMATS:
+            emit('error', {
+                'type': ERR_VALIDATION,
+                'message': f'Unsupported audio format: {audio_format}'
+            }, room=client_id)
+            return
         
-        logger.info(f"Processing transcription: '{transcription_text}' from client: {client_id}")
+        logger.info("Processing transcription: '%s' from client: %s", transcription_text, client_id)
+        
+        if not pipeline_semaphore.acquire(blocking=False):
+            logger.warning(f"Rejecting transcription from {client_id}: {MAX_INFLIGHT_PIPELINES} pipelines in flight")
+            emit('error', {
+                'type': ERR_PROCESSING,
+                'message': 'Server busy, retry',
+                'retry_after': PIPELINE_RETRY_AFTER_SECONDS
+            }, room=client_id)
+            return
         
         # Mark client as processing
-        client_info['is_processing'] = True
-        client_info['current_stage'] = PipelineStage.PROCESSING.value
+        client_info.is_processing = True
+        client_info.current_stage = STAGE_PROCESSING
         
         # Notify client that processing has started
-        emit('processing_status', {
-            'status': 'processing',
-            'message': 'Processing transcription',
-            'stage': 'llm',
-            'timestamp': time.time()
-        }, room=client_id)
+        send_to_client(client_id, 'processing_status', status_payload(STATUS_PROCESSING_TRANSCRIPTION))
         
         try:
+            # Opening utterances are answered from the cache when possible
+            cache_key = None
+            if len(client_info.conversation_history) == 1:
+                cache_key = utterance_cache_key(transcription_text, voice_preference, audio_format,
+                                                should_generate_speech, binary_audio)
+            cached = utterance_cache.get(cache_key) if cache_key else None
+            speech_failed = False
+            
             # 1. Add user message to conversation history
-            client_info['conversation_history'].append({
+            client_info.conversation_history.append({
                 "role": "user",
                 "content": transcription_text
             })
             
             # 2. Process with LLM
-            logger.info(f"Sending to LLM for processing")
-            response_text = generate_chat_response(client_info['conversation_history'])
-            logger.info(f"LLM Response: {response_text}")
+            stream_chunks = stream_response and not binary_audio and not cached
+            if cached:
+                response_text, cached_audio = cached
+                logger.info("Serving cached response for first utterance from client %s", client_id)
+            elif stream_chunks:
+                logger.info("Streaming LLM response to client %s by sentence", client_id)
+                client_info.current_stage = STAGE_STREAMING
+                send_to_client(client_id, 'processing_status', status_payload(STATUS_STREAMING_RESPONSE))
+                response_text = stream_response_chunks(client_id, client_info.conversation_history,
+                                                       voice_preference, audio_format, should_generate_speech)
+                logger.info("LLM Response: %s", response_text)
+            else:
+                logger.info("Sending to LLM for processing")
+                response_text = tpool.execute(generate_chat_response, client_info.conversation_history)
+                logger.info("LLM Response: %s", response_text)
             
             # 3. Add assistant response to conversation history
-            client_info['conversation_history'].append({
+            client_info.conversation_history.append({
                 "role": "assistant",
                 "content": response_text
             })
+            store_in_background(session_store.save_turn, client_id, *client_info.conversation_history[-2:])
+            trim_history(client_info.conversation_history)
             
             # Initialize audio_data as None
             audio_data = None
             
-            # 4. Generate speech if requested
-            if should_generate_speech:
+            # 4. Generate speech if requested (binary and deferred clients get it after the text response)
+            deferred_speech = should_generate_speech and deferred_audio and not binary_audio and not cached and not stream_chunks
+            if should_generate_speech and not binary_audio and cached:
+                audio_data = cached_audio
+            elif should_generate_speech and not binary_audio and not deferred_speech and not stream_chunks:
                 try:
-                    client_info['current_stage'] = PipelineStage.GENERATING_SPEECH.value
-                    emit('processing_status', {
-                        'status': 'processing',
-                        'message': 'Generating speech',
-                        'stage': 'tts',
-                        'timestamp': time.time()
-                    }, room=client_id)
+                    client_info.current_stage = STAGE_GENERATING_SPEECH
+                    send_to_client(client_id, 'processing_status', status_payload(STATUS_GENERATING_SPEECH))
                     
-                    logger.info(f"Generating speech for response using voice: {voice_preference}")
-                    audio_data = generate_speech(response_text, voice=voice_preference)
-                    logger.info(f"Speech generated successfully, size: {len(audio_data) if audio_data else 0} bytes")
+                    logger.info("Generating speech for response using voice: %s", voice_preference)
+                    audio_data = synthesize_speech(response_text, voice=voice_preference, response_format=audio_format)
+                    logger.info("Speech generated successfully, size: %s bytes", len(audio_data) if audio_data else 0)
                     
                 except Exception as speech_error:
-                    logger.error(f"Error generating speech: {str(speech_error)}")
-                    logger.error(traceback.format_exc())
+                    speech_failed = True
+                    logger.exception(f"Error generating speech: {str(speech_error)}")
                     # Continue with text-only response
                     emit('error', {
-                        'type': ErrorTypes.API_ERROR.value,
+                        'type': ERR_API,
                         'message': 'Failed to generate speech audio',
                         'details': str(speech_error),
                         'stage': 'tts'
                     }, room=client_id)
             
             # 5. Send response back to client
-            client_info['current_stage'] = PipelineStage.SENDING.value
-            emit('response', {
+            client_info.current_stage = STAGE_SENDING
+            stream_binary_audio = should_generate_speech and binary_audio
+            send_to_client(client_id, 'response', {
                 'text': response_text,
                 'audio': audio_data,
-                'type': 'voice' if audio_data else 'text',
+                'type': 'voice' if audio_data or stream_binary_audio or deferred_speech or (stream_chunks and should_generate_speech) else 'text',
+                'audio_transport': 'binary' if stream_binary_audio else 'deferred' if deferred_speech else 'chunks' if stream_chunks else 'base64',
+                'audio_format': audio_format,
                 'timestamp': time.time(),
                 'is_final': True
-            }, room=client_id)
+            })
             
-            logger.info(f"Response sent to client {client_id} with audio: {audio_data is not None}")
+            logger.info("Response sent to client %s with audio: %s", client_id, audio_data is not None)
+            
+            # 6. Stream speech as raw binary frames, skipping base64 and JSON encoding
+            if deferred_speech:
+                socketio.start_background_task(send_deferred_speech, client_id, response_text,
+                                               voice_preference, audio_format)
+            elif stream_binary_audio and cached:
+                send_audio_frames((cached_audio,), client_id, audio_format)
+            elif stream_binary_audio:
+                try:
+                    client_info.current_stage = STAGE_GENERATING_SPEECH
+                    send_to_client(client_id, 'processing_status', status_payload(STATUS_STREAMING_SPEECH))
+                    
+                    audio_data = stream_speech_to_client(response_text, voice_preference, client_id, audio_format)
+                    logger.info("Streamed %s bytes of speech to client %s", len(audio_data), client_id)
+                    
+                except Exception as speech_error:
+                    speech_failed = True
+                    logger.exception(f"Error streaming speech: {str(speech_error)}")
+                    emit('error', {
+                        'type': ERR_API,
+                        'message': 'Failed to generate speech audio',
+                        'details': str(speech_error),
+                        'stage': 'tts'
+                    }, room=client_id)
+            
+            # Remember complete replies to opening utterances
+            if cache_key and not cached and not speech_failed and not deferred_speech and not stream_chunks:
+                utterance_cache[cache_key] = (response_text, audio_data)
             
         except Exception as processing_error:
-            logger.error(f"Error processing transcription: {str(processing_error)}")
-            logger.error(traceback.format_exc())
+            logger.exception(f"Error processing transcription: {str(processing_error)}")
             emit('error', {
-                'type': ErrorTypes.API_ERROR.value,
+                'type': ERR_API,
                 'message': 'Failed to process transcription',
                 'details': str(processing_error),
                 'stage': 'llm'
@@ -1292,19 +2480,18 @@ def handle_process_transcription(data):
         
         finally:
             # Reset processing state
-            client_info['is_processing'] = False
-            client_info['current_stage'] = PipelineStage.IDLE.value
+            client_info.is_processing = False
+            client_info.current_stage = STAGE_IDLE
+            pipeline_semaphore.release()
     
     except Exception as e:
-        logger.error(f"Error handling process_transcription: {str(e)}")
-        logger.error(traceback.format_exc())
+        logger.exception(f"Error handling process_transcription: {str(e)}")
         emit('error', {
-            'type': ErrorTypes.PROCESSING_ERROR.value,
+            'type': ERR_PROCESSING,
             'message': f'Error handling process_transcription: {str(e)}',
             'recoverable': True
         }, room=client_id)
         
-        # Reset processing state if client still exists
-        if client_id in connected_clients:
-            connected_clients[client_id]['is_processing'] = False
-            connected_clients[client_id]['current_stage'] = PipelineStage.IDLE.value 
\ No newline at end of file
+        # Reset processing state
+        client_info.is_processing = False
+        client_info.current_stage = STAGE_IDLE
\ No newline at end of file
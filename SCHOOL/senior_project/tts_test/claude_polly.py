@@ -1,20 +1,27 @@
-import boto3
 import os
 import time
 import anthropic
+from functools import lru_cache
+import shutil
 from contextlib import closing
 from dotenv import load_dotenv
+from polly_client import get_polly_client, AUDIO_COPY_SIZE
 
 # Load environment variables
 load_dotenv()
 
+@lru_cache(maxsize=None)
+def get_claude_client(api_key):
+    """Create the Anthropic client once so every prompt reuses its kept-alive connection"""
+    return anthropic.Anthropic(api_key=api_key)
+
 def generate_text_with_claude(prompt):
     api_key = os.environ.get("ANTHROPIC_API_KEY")
     
     if not api_key:
         raise ValueError("ANTHROPIC_API_KEY environment variable not set")
     
-    client = anthropic.Anthropic(api_key=api_key)
+    client = get_claude_client(api_key)
     
     try:
         start_time = time.time()
@@ -46,8 +53,8 @@ def generate_text_with_claude(prompt):
         return None, 0
 
 def text_to_speech(text, output_file="speech.mp3"):
-    # Create a client using your AWS credentials
-    polly_client = boto3.client('polly')
+    # Reuse the Polly client built on the first call
+    polly_client = get_polly_client()
     
     try:
         # Request speech synthesis with Matthew generative voice
@@ -63,7 +70,8 @@ def text_to_speech(text, output_file="speech.mp3"):
         if "AudioStream" in response:
             with closing(response["AudioStream"]) as stream:
                 with open(output_file, "wb") as file:
-                    file.write(stream.read())
+                    # Copy in fixed-size pieces instead of holding the whole MP3 in memory
+                    shutil.copyfileobj(stream, file, AUDIO_COPY_SIZE)
                 print(f"Audio saved successfully to {output_file}")
                 return True
     
@@ -8,26 +8,65 @@ import re
 import io
 import threading
 import queue
-import tempfile
+from concurrent.futures import ThreadPoolExecutor
 
 class Conversation:
+    # Sentence endings, compiled once: SENTENCE_RE splits finished text into sentences and
+    # SENTENCE_END_RE finds where a streamed sentence is complete (terminator plus whitespace)
+    SENTENCE_RE = re.compile(r'([.!?]+)')
+    SENTENCE_END_RE = re.compile(r'[.!?]+(?=\s)')
+    SENTENCE_END_CHARS = frozenset('.!?')
+    AUDIO_BUFFER_COUNT = 4  # Size of the reusable audio buffer ring
+    SYNTHESIS_AHEAD = 2  # Chunks synthesized but not yet played; must stay below AUDIO_BUFFER_COUNT
+    AMBIENT_NOISE_TTL = 30  # Seconds an ambient noise calibration is reused for
+    CONNECTION_IDLE_SECONDS = 30  # Re-warm the OpenAI connection after this long without a request
+
     def __init__(self):
         self.recognizer = sr.Recognizer()
         self.messages = [
             {"role": "system", "content": "You are a helpful assistant. Keep your responses concise and conversational. Use natural breaks and pauses in your speech."}
         ]
-        pygame.mixer.init()
+        # Match OpenAI TTS's 24 kHz MP3 output so pygame skips resampling, and keep the
+        # mixer buffer small so playback starts sooner
+        pygame.mixer.init(frequency=24000, buffer=512)
         self.output_dir = Path(os.path.dirname(__file__))
+        # Ring of audio buffers reused across chunks instead of allocating one per sentence
+        self.audio_buffers = [io.BytesIO() for _ in range(self.AUDIO_BUFFER_COUNT)]
+        self.audio_buffer_index = 0
+        # Runs speech recognition alongside the OpenAI connection warm-up
+        self.executor = ThreadPoolExecutor(max_workers=2)
+        # Synthesizes upcoming chunks while the current one plays
+        self.tts_executor = ThreadPoolExecutor(max_workers=self.SYNTHESIS_AHEAD)
+        self.synthesis_slots = threading.Semaphore(self.SYNTHESIS_AHEAD)
+        self.noise_calibrated_at = None
+        self.last_api_call = 0.0
         
+    def warm_up_openai(self):
+        """Open (or refresh) the OpenAI connection so the next request skips the TLS handshake"""
+        if time.monotonic() - self.last_api_call < self.CONNECTION_IDLE_SECONDS:
+            return
+        self.last_api_call = time.monotonic()
+        try:
+            openai.models.list()
+        except Exception:
+            pass  # Only a warm-up; the real request reports errors
+
     def listen(self):
         """Listen for user input through microphone"""
         with sr.Microphone() as source:
             print("\nListening... (speak now)")
-            self.recognizer.adjust_for_ambient_noise(source)
+            # Calibrating samples a second of audio, so reuse a recent calibration
+            now = time.monotonic()
+            if self.noise_calibrated_at is None or now - self.noise_calibrated_at > self.AMBIENT_NOISE_TTL:
+                self.recognizer.adjust_for_ambient_noise(source)
+                self.noise_calibrated_at = now
             try:
                 audio = self.recognizer.listen(source, timeout=5)
                 print("Processing speech...")
-                text = self.recognizer.recognize_google(audio)
+                # Warm the OpenAI connection while Google recognizes the speech
+                recognition = self.executor.submit(self.recognizer.recognize_google, audio)
+                self.executor.submit(self.warm_up_openai)
+                text = recognition.result()
                 print(f"You said: {text}")
                 return text
             except sr.WaitTimeoutError:
@@ -40,9 +79,10 @@ class Conversation:
                 print(f"Could not request results; {e}")
                 return None
 
-    def get_ai_response(self, user_input):
-        """Get response from OpenAI"""
+    def get_ai_response(self, user_input, on_chunk=None):
+        """Get response from OpenAI, passing each speech chunk to on_chunk as soon as its sentence is complete"""
         self.messages.append({"role": "user", "content": user_input})
+        self.last_api_call = time.monotonic()
         
         try:
             response = openai.chat.completions.create(
@@ -52,17 +92,37 @@ class Conversation:
             )
             
             # Collect the streamed response
-            collected_chunks = []
             collected_messages = []
+            pending = ''
             
             # Process the streamed response
             for chunk in response:
-                collected_chunks.append(chunk)
-                chunk_message = chunk.choices[0].delta
-                collected_messages.append(chunk_message.content if hasattr(chunk_message, 'content') else "")
+                content = chunk.choices[0].delta.content if chunk.choices else None
+                if not content:
+                    continue
+                collected_messages.append(content)
+                
+                if on_chunk:
+                    # Only run the regex when this token holds a terminator or follows one; any
+                    # other token cannot complete a sentence
+                    could_end = pending[-1:] in self.SENTENCE_END_CHARS or not self.SENTENCE_END_CHARS.isdisjoint(content)
+                    pending += content
+                    if could_end:
+                        last_end = None
+                        for last_end in self.SENTENCE_END_RE.finditer(pending):
+                            pass
+                        if last_end:
+                            for speech_chunk in self.chunk_text(pending[:last_end.end()]):
+                                on_chunk(speech_chunk)
+                            pending = pending[last_end.end():]
+            
+            # Flush the last, unterminated sentence
+            if on_chunk:
+                for speech_chunk in self.chunk_text(pending):
+                    on_chunk(speech_chunk)
             
             # Combine the message
-            ai_response = ''.join([m for m in collected_messages if m is not None])
+            ai_response = ''.join(collected_messages)
             self.messages.append({"role": "assistant", "content": ai_response})
             return ai_response
             
@@ -73,7 +133,7 @@ class Conversation:
     def chunk_text(self, text):
         """Split text into natural chunks for speech"""
         # First split by sentence endings
-        chunks = re.split('([.!?]+)', text)
+        chunks = self.SENTENCE_RE.split(text)
         
         # Recombine sentence endings with their sentences
         proper_sentences = []
@@ -102,53 +162,92 @@ class Conversation:
         return final_chunks
 
     def play_audio(self, audio_file):
-        """Play audio using pygame"""
+        """Play audio using pygame, from a file path or an in-memory MP3 file object"""
         try:
-            pygame.mixer.music.load(audio_file)
+            pygame.mixer.music.load(audio_file, 'mp3')
             pygame.mixer.music.play()
             while pygame.mixer.music.get_busy():
-                pygame.time.Clock().tick(10)
+                # Sleep between checks; the end of playback is noticed within 10 ms
+                pygame.time.wait(10)
         except Exception as e:
             print(f"Error playing audio: {e}")
 
-    def speak_chunk(self, text, chunk_number):
-        """Convert text chunk to speech using Nova voice and stream the audio"""
-        try:
-            # Generate speech with streaming
-            response = openai.audio.speech.create(
-                model="tts-1",  # Using standard model for lower latency
-                voice="nova",
-                input=text,
-                speed=1.1  # Slightly faster speech for more natural conversation
-            )
+    def next_audio_buffer(self):
+        """Take the next buffer from the ring, rewound so it can be refilled"""
+        audio = self.audio_buffers[self.audio_buffer_index]
+        self.audio_buffer_index = (self.audio_buffer_index + 1) % self.AUDIO_BUFFER_COUNT
+        audio.seek(0)
+        return audio
 
-            # Create a temporary file to store the audio chunk
-            with tempfile.NamedTemporaryFile(suffix='.mp3', delete=False) as temp_file:
-                # Stream the audio data to the temporary file
-                for chunk in response.iter_bytes(chunk_size=4096):
-                    temp_file.write(chunk)
-                temp_file.flush()
-                
-                # Play the audio
-                self.play_audio(temp_file.name)
+    def synthesize_chunk(self, text, audio):
+        """Convert text chunk to speech using Nova voice, streaming the MP3 into the given buffer"""
+        # Generate speech with streaming
+        response = openai.audio.speech.create(
+            model="tts-1",  # Using standard model for lower latency
+            voice="nova",
+            input=text,
+            speed=1.1  # Slightly faster speech for more natural conversation
+        )
 
-            # Clean up the temporary file
-            os.unlink(temp_file.name)
-                
+        # Stream the audio data into memory; pygame plays it from there without a temp file.
+        # Overwriting a reused buffer keeps its capacity, truncate() only drops the old tail.
+        for chunk in response.iter_bytes(chunk_size=4096):
+            audio.write(chunk)
+        audio.truncate()
+        audio.seek(0)
+        return audio
+
+    def submit_chunk(self, text):
+        """Start synthesizing a chunk ahead of playback, waiting while SYNTHESIS_AHEAD chunks are unplayed"""
+        self.synthesis_slots.acquire()
+        return self.tts_executor.submit(self.synthesize_chunk, text, self.next_audio_buffer())
+
+    def play_chunk(self, future):
+        """Play a chunk from submit_chunk once its audio is ready"""
+        try:
+            self.play_audio(future.result())
         except Exception as e:
             print(f"Error generating or playing speech chunk: {e}")
+        finally:
+            self.synthesis_slots.release()
 
-    def speak(self, text):
-        """Split response into chunks and speak them sequentially with streaming"""
-        chunks = self.chunk_text(text)
+    def speak_stream(self, produce):
+        """Speak chunks in order while produce(on_chunk) is still generating them, returning its result"""
+        ready = queue.Queue()
+        
+        # Playback runs on its own thread so synthesis of later chunks overlaps it
+        def speaker():
+            while True:
+                item = ready.get()
+                if item is None:
+                    break
+                chunk, future = item
+                # Print chunk with appropriate punctuation
+                print(chunk, end=' ', flush=True)
+                self.play_chunk(future)
+        
         print("\nAI: ", end='', flush=True)
+        speaker_thread = threading.Thread(target=speaker, daemon=True)
+        speaker_thread.start()
         
-        for i, chunk in enumerate(chunks):
-            # Print chunk with appropriate punctuation
-            print(chunk, end=' ', flush=True)
-            self.speak_chunk(chunk, i)
-            
-        print()  # New line after complete response
+        try:
+            return produce(lambda chunk: ready.put((chunk, self.submit_chunk(chunk))))
+        finally:
+            ready.put(None)
+            speaker_thread.join()
+            print()  # New line after complete response
+
+    def speak(self, text):
+        """Split response into chunks and speak them in order, synthesizing ahead of playback"""
+        def produce(on_chunk):
+            for chunk in self.chunk_text(text):
+                on_chunk(chunk)
+        
+        self.speak_stream(produce)
+
+    def respond(self, user_input):
+        """Get the AI response and speak each sentence while the rest is still being generated"""
+        return self.speak_stream(lambda on_chunk: self.get_ai_response(user_input, on_chunk=on_chunk))
 
 def main():
     # Check for OpenAI API key
@@ -171,11 +270,8 @@ def main():
                 conversation.speak("Goodbye!")
                 break
             
-            # Get AI response
-            ai_response = conversation.get_ai_response(user_input)
-            if ai_response:
-                # Speak response in chunks
-                conversation.speak(ai_response)
+            # Get AI response, speaking it in chunks as it streams in
+            conversation.respond(user_input)
         
         print("\nReady for next input...")
 
@@ -1,13 +1,20 @@
-import boto3
 import os
+import shutil
 from contextlib import closing
 from dotenv import load_dotenv
 from openai import OpenAI
 import time
+from functools import lru_cache
+from polly_client import get_polly_client, AUDIO_COPY_SIZE
 
 # Load environment variables from .env file
 load_dotenv()
 
+@lru_cache(maxsize=None)
+def get_deepseek_client(api_key):
+    """Create the Deepseek client once so every prompt reuses its kept-alive connection"""
+    return OpenAI(api_key=api_key, base_url="https://api.deepseek.com")
+
 # Function to call Deepseek v3 API using OpenAI client
 def generate_text(prompt):
     # Get API key from environment variables
@@ -16,8 +23,8 @@ def generate_text(prompt):
     if not api_key:
         raise ValueError("DEEPSEEK_API_KEY environment variable not set")
     
-    # Initialize the OpenAI client with Deepseek's base URL
-    client = OpenAI(api_key=api_key, base_url="https://api.deepseek.com")
+    # Get the OpenAI client bound to Deepseek's base URL
+    client = get_deepseek_client(api_key)
     
     try:
         # Create chat completion using OpenAI-compatible format
@@ -34,9 +41,8 @@ def generate_text(prompt):
             stream=True  # Changed to True to enable streaming
         )
         
-        # Process streaming response
+        # Process streaming response, joining the pieces once at the end
         collected_chunks = []
-        collected_response = ""
         
         # Display tokens as they arrive
         print("\nResponse streaming:")
@@ -45,18 +51,17 @@ def generate_text(prompt):
             if chunk_content is not None:
                 print(chunk_content, end="", flush=True)
                 collected_chunks.append(chunk_content)
-                collected_response += chunk_content
         print("\n")
         
-        return collected_response
+        return ''.join(collected_chunks)
     
     except Exception as e:
         print(f"Error calling Deepseek API: {str(e)}")
         return None
 
 def text_to_speech(text, output_file="speech.mp3"):
-    # Create a client using your AWS credentials
-    polly_client = boto3.client('polly')
+    # Reuse the Polly client built on the first call
+    polly_client = get_polly_client()
     
     try:
         # Request speech synthesis with Matthew generative voice
@@ -72,7 +77,8 @@ def text_to_speech(text, output_file="speech.mp3"):
         if "AudioStream" in response:
             with closing(response["AudioStream"]) as stream:
                 with open(output_file, "wb") as file:
-                    file.write(stream.read())
+                    # Copy in fixed-size pieces instead of holding the whole MP3 in memory
+                    shutil.copyfileobj(stream, file, AUDIO_COPY_SIZE)
                 print(f"Audio saved successfully to {output_file}")
                 return True
     
@@ -21,23 +21,23 @@ def list_english_premium_voices():
     def is_english_voice(voice):
         return any(lang.startswith('en-') for lang in voice.language_codes)
     
-    # Filter and print Journey voices
-    print("\n=== English Journey Voices ===")
-    journey_voices = [voice for voice in response.voices if "Journey" in voice.name and is_english_voice(voice)]
-    for voice in sorted(journey_voices, key=lambda x: x.name):
-        print_voice_details(voice)
+    # Sort English voices into their families in one pass over the list,
+    # keyed by the substring each family's voice names contain
+    family_titles = {"Journey": "Journey", "Wavenet": "WaveNet", "Neural2": "Neural2"}
+    voice_families = {family: [] for family in family_titles}
+    for voice in response.voices:
+        if not is_english_voice(voice):
+            continue
+        for family, voices in voice_families.items():
+            if family in voice.name:
+                voices.append(voice)
+                break
     
-    # Filter and print WaveNet voices
-    print("\n=== English WaveNet Voices ===")
-    wavenet_voices = [voice for voice in response.voices if "Wavenet" in voice.name and is_english_voice(voice)]
-    for voice in sorted(wavenet_voices, key=lambda x: x.name):
-        print_voice_details(voice)
-    
-    # Filter and print Neural2 voices
-    print("\n=== English Neural2 Voices ===")
-    neural2_voices = [voice for voice in response.voices if "Neural2" in voice.name and is_english_voice(voice)]
-    for voice in sorted(neural2_voices, key=lambda x: x.name):
-        print_voice_details(voice)
+    # Print each family's voices
+    for family, voices in voice_families.items():
+        print(f"\n=== English {family_titles[family]} Voices ===")
+        for voice in sorted(voices, key=lambda x: x.name):
+            print_voice_details(voice)
 
 if __name__ == "__main__":
     list_english_premium_voices() 
\ No newline at end of file
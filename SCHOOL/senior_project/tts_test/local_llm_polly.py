@@ -1,10 +1,11 @@
-import boto3
 import os
 import time
 import requests
+import shutil
 from contextlib import closing
 from dotenv import load_dotenv
 import json
+from polly_client import get_polly_client, AUDIO_COPY_SIZE
 
 # Load environment variables
 load_dotenv()
@@ -25,26 +26,28 @@ def generate_text_with_ollama(prompt, model="llama3:8b"):
         )
         
         if response.status_code == 200:
-            full_response = ""
+            pieces = []  # Joined once at the end instead of re-copying the text per token
             print("\nStreaming response:")
             
-            for line in response.iter_lines():
-                if line:
-                    # Each line is a JSON object
-                    chunk = json.loads(line.decode('utf-8'))
-                    
-                    # Print the response piece
-                    if 'response' in chunk:
-                        print(chunk['response'], end='', flush=True)
-                        full_response += chunk['response']
-                    
-                    # Check for the done status
-                    if chunk.get('done', False):
-                        break
+            with closing(response):
+                for line in response.iter_lines(chunk_size=1024):
+                    if line:
+                        # Each line is a JSON object; json.loads takes the raw bytes
+                        chunk = json.loads(line)
+                        
+                        # Print the response piece
+                        piece = chunk.get('response')
+                        if piece:
+                            print(piece, end='', flush=True)
+                            pieces.append(piece)
+                        
+                        # Check for the done status
+                        if chunk.get('done', False):
+                            break
             
             print("\n")  # Add a new line after streaming completes
             elapsed = time.time() - start_time
-            return full_response, elapsed
+            return ''.join(pieces), elapsed
         else:
             print(f"Error: {response.status_code}")
             return None, 0
@@ -53,8 +56,8 @@ def generate_text_with_ollama(prompt, model="llama3:8b"):
         return None, 0
 
 def text_to_speech(text, output_file="speech.mp3"):
-    # Create a client using your AWS credentials
-    polly_client = boto3.client('polly')
+    # Reuse the Polly client built on the first call
+    polly_client = get_polly_client()
     
     try:
         # Request speech synthesis with Matthew generative voice
@@ -70,7 +73,8 @@ def text_to_speech(text, output_file="speech.mp3"):
         if "AudioStream" in response:
             with closing(response["AudioStream"]) as stream:
                 with open(output_file, "wb") as file:
-                    file.write(stream.read())
+                    # Copy in fixed-size pieces instead of holding the whole MP3 in memory
+                    shutil.copyfileobj(stream, file, AUDIO_COPY_SIZE)
                 print(f"Audio saved successfully to {output_file}")
                 return True
     
@@ -1,9 +1,10 @@
-import boto3
+import shutil
 from contextlib import closing
+from polly_client import get_polly_client, AUDIO_COPY_SIZE
 
 def text_to_speech(text, output_file="speech.mp3"):
-    # Create a client using your AWS credentials
-    polly_client = boto3.client('polly')
+    # Reuse the Polly client built on the first call
+    polly_client = get_polly_client()
     
     try:
         # Request speech synthesis with Michael-Neural voice
@@ -19,7 +20,8 @@ def text_to_speech(text, output_file="speech.mp3"):
         if "AudioStream" in response:
             with closing(response["AudioStream"]) as stream:
                 with open(output_file, "wb") as file:
-                    file.write(stream.read())
+                    # Copy in fixed-size pieces instead of holding the whole MP3 in memory
+                    shutil.copyfileobj(stream, file, AUDIO_COPY_SIZE)
                 print(f"Audio saved successfully to {output_file}")
     
     except Exception as e:
@@ -1,16 +1,28 @@
-import boto3
 import os
+import re
+import sys
 import time
-import pygame
+import queue
+import threading
+import wave
+import pyaudio
 import speech_recognition as sr
-from io import BytesIO
 from contextlib import closing
 from dotenv import load_dotenv
+from functools import lru_cache
+from xml.sax.saxutils import escape
 from openai import OpenAI
+from polly_client import get_polly_client
 
 # Load environment variables
 load_dotenv()
 
+# Credentials, read once after the .env file is loaded
+OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
+AWS_ACCESS_KEY_ID = os.environ.get("AWS_ACCESS_KEY_ID")
+AWS_SECRET_ACCESS_KEY = os.environ.get("AWS_SECRET_ACCESS_KEY")
+AWS_REGION = os.environ.get("AWS_REGION", "us-east-1")
+
 # Available voice options
 AVAILABLE_VOICES = {
     "1": "Matthew",
@@ -20,19 +32,73 @@ AVAILABLE_VOICES = {
     "5": "Kevin",
     "6": "Danielle"
 }
+VOICE_GENDERS = {
+    "Matthew": "male",
+    "Joanna": "female",
+    "Stephen": "male",
+    "Ruth": "female",
+    "Kevin": "male",
+    "Danielle": "female"
+}
+
+# Lowercase voice names, so a spoken command is matched with one lookup per word
+VOICE_NAMES_LOWER = {name.lower(): name for name in AVAILABLE_VOICES.values()}
+WORD_RE = re.compile(r"[a-z]+")
+
+# Voice change phrases ("change voice", "switch voice", "use voice"), found in one scan
+VOICE_COMMAND_RE = re.compile(r"(change|switch|use) voice")
+
+# Polly engines; neural answers faster, generative sounds more natural and is opt-in
+ENGINES = {"1": "neural", "2": "generative"}
+
+# Speaking rates applied through SSML <prosody rate>; both engines accept percentages.
+# The default rate sends plain text, so Polly skips SSML parsing for it.
+SPEECH_RATES = {"1": "100%", "2": "90%", "3": "80%", "4": "115%"}
+DEFAULT_SPEECH_RATE = "100%"
+
+# Polly returns raw 16-bit mono PCM, which is played chunk by chunk as it arrives
+PCM_SAMPLE_RATE = 16000
+PCM_CHUNK_SIZE = 4096
+
+# Sentence endings in the streamed reply; each finished sentence is sent to Polly while the
+# rest is still generating. Text without an ending is flushed at a space once it is this long.
+SENTENCE_END_RE = re.compile(r'[.?!]+(?=\s)')
+MAX_PENDING_CHARS = 300  # Roughly 80 tokens
+SENTENCE_END_CHARS = frozenset('.?!')
+
+# Streamed tokens written to the terminal between flushes
+STDOUT_FLUSH_CHUNKS = 16
+
+# Also save each spoken sentence to <voice>_response_<n>.wav for debugging
+SAVE_RESPONSE_AUDIO = False
+
+# Shared recognizer, so the ambient noise calibration carries over between turns;
+# the dynamic threshold keeps adapting to noise while it listens
+recognizer = sr.Recognizer()
+recognizer.dynamic_energy_threshold = True
+noise_calibrated = False
+
+def recalibrate():
+    """
+    Measure the ambient noise again on the next listen
+    """
+    global noise_calibrated
+    noise_calibrated = False
 
 def listen_for_speech():
     """
     Listen to the microphone and convert speech to text
     """
-    recognizer = sr.Recognizer()
+    global noise_calibrated
     
     print("Listening... (speak now)")
     
     try:
         with sr.Microphone() as source:
-            # Adjust for ambient noise and set timeout
-            recognizer.adjust_for_ambient_noise(source, duration=1)
+            # Calibrating blocks for a second, so only do it once per session
+            if not noise_calibrated:
+                recognizer.adjust_for_ambient_noise(source, duration=1)
+                noise_calibrated = True
             audio = recognizer.listen(source, timeout=10, phrase_time_limit=15)
         
         print("Processing speech...")
@@ -55,13 +121,34 @@ def listen_for_speech():
         print(f"Error during speech recognition: {e}")
         return None
 
-def generate_text_with_openai(prompt):
-    api_key = os.environ.get("OPENAI_API_KEY")
+@lru_cache(maxsize=None)
+def get_openai_client(api_key):
+    """Create the OpenAI client once so every prompt reuses its kept-alive connection"""
+    return OpenAI(api_key=api_key)
+
+def flush_sentences(pending, on_sentence):
+    """Pass the complete sentences in pending to on_sentence and return the unfinished rest"""
+    last_end = None
+    for last_end in SENTENCE_END_RE.finditer(pending):
+        pass
+    if last_end:
+        cut = last_end.end()
+    elif len(pending) > MAX_PENDING_CHARS and ' ' in pending:
+        cut = pending.rindex(' ')
+    else:
+        return pending
     
-    if not api_key:
+    sentence = pending[:cut].strip()
+    if sentence:
+        on_sentence(sentence)
+    return pending[cut:]
+
+def generate_text_with_openai(prompt, on_sentence=None):
+    """Stream a reply from OpenAI, passing each finished sentence to on_sentence as it completes"""
+    if not OPENAI_API_KEY:
         raise ValueError("OPENAI_API_KEY environment variable not set")
     
-    client = OpenAI(api_key=api_key)
+    client = get_openai_client(OPENAI_API_KEY)
     
     try:
         start_time = time.time()
@@ -78,92 +165,175 @@ def generate_text_with_openai(prompt):
             stream=True
         )
         
-        collected_response = ""
+        collected_chunks = []
+        pending = ''
         print("\nResponse streaming:")
         for chunk in response:
             chunk_content = chunk.choices[0].delta.content
             if chunk_content is not None:
-                print(chunk_content, end="", flush=True)
-                collected_response += chunk_content
+                sys.stdout.write(chunk_content)
+                collected_chunks.append(chunk_content)
+                # Flush every STDOUT_FLUSH_CHUNKS tokens instead of once per token
+                if len(collected_chunks) % STDOUT_FLUSH_CHUNKS == 0:
+                    sys.stdout.flush()
+                if on_sentence:
+                    # A token can only finish a sentence if it holds a terminator or follows one,
+                    # so the regex over pending runs for those tokens (or an overlong pending) only
+                    if (pending[-1:] in SENTENCE_END_CHARS or not SENTENCE_END_CHARS.isdisjoint(chunk_content)
+                            or len(pending) > MAX_PENDING_CHARS):
+                        pending = flush_sentences(pending + chunk_content, on_sentence)
+                    else:
+                        pending += chunk_content
         print("\n")
         
+        # Flush the last, unterminated sentence
+        if on_sentence and pending.strip():
+            on_sentence(pending.strip())
+        
         elapsed = time.time() - start_time
-        return collected_response, elapsed
+        return ''.join(collected_chunks), elapsed
     
     except Exception as e:
         print(f"Error: {str(e)}")
         return None, 0
 
-def text_to_speech_streaming(text, output_file="speech.mp3", voice_id="Matthew"):
-    # Get credentials from environment variables
-    access_key = os.environ.get("AWS_ACCESS_KEY_ID")
-    secret_key = os.environ.get("AWS_SECRET_ACCESS_KEY")
-    region = os.environ.get("AWS_REGION", "us-east-1")
+# Guards the PyAudio factory: warm_up and the first reply's playback can both call it
+pyaudio_lock = threading.Lock()
+
+@lru_cache(maxsize=None)
+def _create_pyaudio():
+    return pyaudio.PyAudio()
+
+def get_pyaudio():
+    """Initialize PortAudio once instead of scanning the audio devices for every response"""
+    with pyaudio_lock:
+        return _create_pyaudio()
+
+def get_env_polly_client():
+    """Return the Polly client for the credentials in the environment, or None if they are missing"""
+    if not AWS_ACCESS_KEY_ID or not AWS_SECRET_ACCESS_KEY:
+        return None
     
-    if not access_key or not secret_key:
+    # Create client with explicit credentials, reused across calls
+    return get_polly_client(
+        aws_access_key_id=AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
+        region_name=AWS_REGION
+    )
+
+def build_speech_request(text, rate=DEFAULT_SPEECH_RATE):
+    """Return the Polly TextType and Text for a sentence, wrapping it in SSML to change its rate"""
+    if rate == DEFAULT_SPEECH_RATE:
+        return "text", text
+    return "ssml", f'<speak><prosody rate="{rate}">{escape(text)}</prosody></speak>'
+
+def request_speech(text, voice_id="Matthew", engine="neural", rate=DEFAULT_SPEECH_RATE):
+    """Start a Polly synthesis and return its PCM AudioStream, or None if the request failed"""
+    polly_client = get_env_polly_client()
+    if polly_client is None:
         print("Error: AWS credentials not found in environment variables")
         print("Make sure AWS_ACCESS_KEY_ID and AWS_SECRET_ACCESS_KEY are set in your .env file")
-        return False
-    
-    # Create client with explicit credentials
-    polly_client = boto3.client(
-        'polly',
-        aws_access_key_id=access_key,
-        aws_secret_access_key=secret_key,
-        region_name=region
-    )
+        return None
     
     try:
         print(f"\nGenerating speech with {voice_id} voice...")
+        text_type, speech_text = build_speech_request(text, rate)
         
-        # Request speech synthesis
+        # Request raw PCM so it can be played without waiting for a complete MP3
         response = polly_client.synthesize_speech(
-            Engine="generative",
+            Engine=engine,
             LanguageCode="en-US",
-            OutputFormat="mp3",
+            OutputFormat="pcm",
+            SampleRate=str(PCM_SAMPLE_RATE),
             VoiceId=voice_id,
-            Text=text
+            TextType=text_type,
+            Text=speech_text
         )
+        return response.get("AudioStream")
+    
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return None
+
+def play_speech(audio_stream, output_file=None):
+    """Play a Polly PCM stream as it arrives, optionally saving it to a WAV file"""
+    try:
+        print("Playing audio...")
+        player = get_pyaudio().open(format=pyaudio.paInt16, channels=1, rate=PCM_SAMPLE_RATE, output=True)
+        wav_file = None
+        if output_file:
+            wav_file = wave.open(output_file, "wb")
+            wav_file.setnchannels(1)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(PCM_SAMPLE_RATE)
         
-        # Initialize pygame mixer
-        pygame.mixer.init()
+        try:
+            # Playback starts with the first chunk; writing to the player blocks while
+            # its buffer is full, so the next chunk is read while this one plays
+            with closing(audio_stream) as stream:
+                while chunk := stream.read(PCM_CHUNK_SIZE):
+                    player.write(chunk)
+                    if wav_file:
+                        wav_file.writeframes(chunk)
+        finally:
+            player.stop_stream()
+            player.close()
+            if wav_file:
+                wav_file.close()
+                print(f"Audio saved to {output_file}")
         
-        # Save the audio stream to a file and play it
-        if "AudioStream" in response:
-            # Save to a BytesIO object first
-            audio_stream = BytesIO()
-            audio_stream.write(response["AudioStream"].read())
-            audio_stream.seek(0)
-            
-            # Save to file
-            with open(output_file, "wb") as file:
-                file.write(audio_stream.getvalue())
-            
-            print(f"Audio saved to {output_file}")
-            print("Playing audio...")
-            
-            # Load and play the audio
-            pygame.mixer.music.load(output_file)
-            pygame.mixer.music.play()
-            
-            # Wait for playback to finish
-            while pygame.mixer.music.get_busy():
-                pygame.time.Clock().tick(10)
-            
-            return True
+        return True
     
     except Exception as e:
         print(f"Error: {str(e)}")
         return False
 
+def text_to_speech_streaming(text, output_file=None, voice_id="Matthew", engine="neural", rate=DEFAULT_SPEECH_RATE):
+    audio_stream = request_speech(text, voice_id, engine, rate)
+    return play_speech(audio_stream, output_file) if audio_stream else False
+
+def speak_sentences(sentences, voice_id, engine, rate=DEFAULT_SPEECH_RATE):
+    """Speak queued sentences in order until None is queued, so Polly overlaps the LLM stream"""
+    # Synthesis runs ahead of playback on its own thread: the next sentence's Polly
+    # request is already answered by the time the current one finishes playing
+    audio_streams = queue.Queue(maxsize=1)
+    
+    def request_ahead():
+        try:
+            while (sentence := sentences.get()) is not None:
+                audio_stream = request_speech(sentence, voice_id, engine, rate)
+                if audio_stream:
+                    audio_streams.put(audio_stream)
+        finally:
+            audio_streams.put(None)
+    
+    threading.Thread(target=request_ahead, daemon=True).start()
+    
+    index = 0
+    while (audio_stream := audio_streams.get()) is not None:
+        filename = f"{voice_id.lower()}_response_{index}.wav" if SAVE_RESPONSE_AUDIO else None
+        play_speech(audio_stream, filename)
+        index += 1
+
+def warm_up():
+    """Open the Polly and OpenAI connections and PortAudio while the user reads the menu"""
+    try:
+        get_pyaudio()
+        polly_client = get_env_polly_client()
+        if polly_client:
+            polly_client.describe_voices(Engine="neural", LanguageCode="en-US")
+        if OPENAI_API_KEY:
+            get_openai_client(OPENAI_API_KEY).models.list()
+    except Exception:
+        pass  # Only a warm-up; the real requests report errors
+
 def select_voice():
     """
     Allows the user to select a voice
     """
     print("\nAvailable voices:")
     for key, name in AVAILABLE_VOICES.items():
-        gender = "female" if name in ["Joanna", "Ruth", "Danielle"] else "male"
-        print(f"{key}. {name} (generative, {gender})")
+        print(f"{key}. {name} ({VOICE_GENDERS[name]})")
     
     while True:
         choice = input("\nSelect voice (1-6, default is 1): ")
@@ -174,6 +344,42 @@ def select_voice():
         else:
             print("Invalid choice. Please select 1-6.")
 
+def select_engine():
+    """
+    Allows the user to opt in to the slower generative engine
+    """
+    print("\nAvailable engines:")
+    print("1. neural (faster responses)")
+    print("2. generative (more natural, slower)")
+    
+    while True:
+        choice = input("\nSelect engine (1-2, default is 1): ")
+        if choice == "":
+            return "neural"  # Default
+        elif choice in ENGINES:
+            return ENGINES[choice]
+        else:
+            print("Invalid choice. Please select 1 or 2.")
+
+def select_speech_rate():
+    """
+    Allows the user to slow down or speed up the assistant's speech
+    """
+    print("\nSpeaking rates:")
+    print("1. normal")
+    print("2. slightly slower")
+    print("3. slow (calmer pacing)")
+    print("4. slightly faster")
+    
+    while True:
+        choice = input("\nSelect speaking rate (1-4, default is 1): ")
+        if choice == "":
+            return DEFAULT_SPEECH_RATE  # Default
+        elif choice in SPEECH_RATES:
+            return SPEECH_RATES[choice]
+        else:
+            print("Invalid choice. Please select 1-4.")
+
 def check_for_voice_command(text, current_voice):
     """
     Check if the text contains a command to change voice
@@ -182,14 +388,16 @@ def check_for_voice_command(text, current_voice):
     text_lower = text.lower()
     
     # Check for various voice change phrases
-    if "change voice" in text_lower or "switch voice" in text_lower or "use voice" in text_lower:
-        for key, name in AVAILABLE_VOICES.items():
-            if name.lower() in text_lower:
+    command_verbs = set(VOICE_COMMAND_RE.findall(text_lower))
+    if command_verbs:
+        for word in WORD_RE.findall(text_lower):
+            name = VOICE_NAMES_LOWER.get(word)
+            if name:
                 print(f"Changing voice to {name}")
                 return name
         
         # If voice name not found in command but change requested
-        if "change voice" in text_lower or "switch voice" in text_lower:
+        if command_verbs - {"use"}:
             print("Voice change requested. Please select:")
             return select_voice()
     
@@ -198,10 +406,13 @@ def check_for_voice_command(text, current_voice):
 # Main function
 def main():
     print("Welcome to the voice assistant!")
+    # Pay the cold-start costs while the menu and voice selection are on screen
+    threading.Thread(target=warm_up, daemon=True).start()
     print("You can:")
     print("- Speak directly to ask questions")
     print("- Say 'change voice' to select a different voice")
     print("- Type 'text' to switch to text input mode")
+    print("- Type 'recalibrate' if the background noise changes")
     print("- Say or type 'exit' to quit")
     
     voice_mode = True  # Start in voice mode by default
@@ -209,7 +420,9 @@ def main():
     # Initial voice selection
     print("\nFirst, let's choose a voice for the assistant.")
     current_voice = select_voice()
-    print(f"Using {current_voice}'s voice. Let's begin!")
+    current_engine = select_engine()
+    current_rate = select_speech_rate()
+    print(f"Using {current_voice}'s voice with the {current_engine} engine at {current_rate} speed. Let's begin!")
     
     while True:
         if voice_mode:
@@ -228,6 +441,10 @@ def main():
                     current_voice = select_voice()
                     print(f"Changed voice to {current_voice}")
                     break
+                elif user_choice.lower() == 'recalibrate':
+                    recalibrate()
+                    print("Background noise will be measured again before listening.")
+                    break
                 elif user_choice != "":
                     # If they typed something else, treat it as a text prompt
                     user_prompt = user_choice
@@ -271,17 +488,22 @@ def main():
                 print(f"Changed voice to {current_voice}")
                 continue
         
-        # Process the prompt and get response
-        ai_response, elapsed_time = generate_text_with_openai(user_prompt)
+        # Process the prompt, speaking each sentence in the selected voice as soon as it is generated
+        sentences = queue.Queue()
+        speaker = threading.Thread(target=speak_sentences, args=(sentences, current_voice, current_engine, current_rate), daemon=True)
+        speaker.start()
+        try:
+            ai_response, elapsed_time = generate_text_with_openai(user_prompt, on_sentence=sentences.put)
+        finally:
+            sentences.put(None)
         
         if ai_response:
-            print(f"\nResponse (took {elapsed_time:.2f} seconds):")
-            
-            # Use the selected voice
-            filename = f"{current_voice.lower()}_response.mp3"
-            text_to_speech_streaming(ai_response, filename, current_voice)
+            print(f"\nResponse (took {elapsed_time:.2f} seconds)")
         else:
             print("Failed to get a response")
+        
+        # Let the reply finish playing before listening again
+        speaker.join()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,22 @@
+import boto3
+from functools import lru_cache
+from botocore.config import Config
+
+# Connection pool and retry settings shared by every Polly client
+POLLY_CONFIG = Config(
+    max_pool_connections=50,
+    retries={'max_attempts': 2, 'mode': 'adaptive'}
+)
+
+# Bytes copied per read when saving a Polly AudioStream to disk
+AUDIO_COPY_SIZE = 1 << 16
+
+@lru_cache(maxsize=None)
+def get_polly_client(**client_kwargs):
+    """Create a Polly client on first use and reuse it for every later synthesis.
+
+    Building a boto3 client loads the service model and resolves credentials and
+    endpoints, so doing it once per call adds noticeable latency. Clients are
+    cached per set of keyword arguments (e.g. explicit credentials or region).
+    """
+    return boto3.client('polly', config=POLLY_CONFIG, **client_kwargs)
@@ -1,25 +1,74 @@
 from google.cloud import texttospeech
+from google.oauth2 import service_account
+from collections import namedtuple
+from functools import lru_cache
+from operator import attrgetter
+import json
 import os
+import time
 
-# Set the credentials environment variable
-os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = os.path.join(os.path.dirname(__file__), "credentials.json")
+# Directory of this script, where the credentials are read and the audio is written
+SCRIPT_DIR = os.path.dirname(__file__)
+CREDENTIALS_FILE = os.path.join(SCRIPT_DIR, "credentials.json")
 
-def get_english_premium_voices():
-    client = texttospeech.TextToSpeechClient()
-    response = client.list_voices()
+# The voice catalog rarely changes, so the voice list is cached on disk for a day
+VOICE_CACHE_FILE = os.path.join(os.path.expanduser("~"), ".cache", "tts_voices.json")
+VOICE_CACHE_TTL = 24 * 60 * 60
+
+# The voice fields the script uses, copied out of the protobuf messages once
+Voice = namedtuple('Voice', 'name language_codes ssml_gender')
+
+@lru_cache(maxsize=None)
+def get_tts_client():
+    """Create the Text-to-Speech client once; construction sets up auth and the gRPC channel"""
+    # Load the service account directly instead of having google.auth discover it
+    credentials = service_account.Credentials.from_service_account_file(CREDENTIALS_FILE)
+    return texttospeech.TextToSpeechClient(credentials=credentials)
+
+def list_voices_cached():
+    """Return every voice as a Voice tuple, from the disk cache when it is fresh"""
+    try:
+        if time.time() - os.path.getmtime(VOICE_CACHE_FILE) < VOICE_CACHE_TTL:
+            with open(VOICE_CACHE_FILE, 'r') as file:
+                return [Voice(name, tuple(codes), gender) for name, codes, gender in json.load(file)]
+    except (OSError, ValueError):
+        pass  # Missing or unreadable cache; fetch a fresh list below
     
-    def is_gb_us_voice(voice):
-        return any(lang in ['en-GB', 'en-US'] for lang in voice.language_codes)
+    voices = [
+        Voice(
+            voice.name,
+            tuple(voice.language_codes),
+            voice.ssml_gender.name if hasattr(voice.ssml_gender, 'name') else str(voice.ssml_gender)
+        )
+        for voice in get_tts_client().list_voices().voices
+    ]
+    try:
+        os.makedirs(os.path.dirname(VOICE_CACHE_FILE), exist_ok=True)
+        with open(VOICE_CACHE_FILE, 'w') as file:
+            json.dump(voices, file)
+    except OSError:
+        pass  # Caching is best effort
+    return voices
+
+def get_english_premium_voices():
+    all_voices = list_voices_cached()
     
-    # Get all GB and US premium voices
-    journey_voices = [voice for voice in response.voices if "Journey" in voice.name and is_gb_us_voice(voice)]
-    wavenet_voices = [voice for voice in response.voices if "Wavenet" in voice.name and is_gb_us_voice(voice)]
-    neural2_voices = [voice for voice in response.voices if "Neural2" in voice.name and is_gb_us_voice(voice)]
+    # Sort GB and US premium voices into their families in one pass, keyed by the
+    # substring each family's voice names contain
+    family_titles = {"Journey": "Journey", "Wavenet": "WaveNet", "Neural2": "Neural2"}
+    voice_families = {family: [] for family in family_titles}
+    gb_us_codes = {'en-GB', 'en-US'}
+    for voice in all_voices:
+        if gb_us_codes.isdisjoint(voice.language_codes):
+            continue
+        for family, voices in voice_families.items():
+            if family in voice.name:
+                voices.append(voice)
+                break
     
     return {
-        "Journey": sorted(journey_voices, key=lambda x: x.name),
-        "WaveNet": sorted(wavenet_voices, key=lambda x: x.name),
-        "Neural2": sorted(neural2_voices, key=lambda x: x.name)
+        family_titles[family]: sorted(voices, key=attrgetter('name'))
+        for family, voices in voice_families.items()
     }
 
 def display_voice_options(voices_dict):
@@ -32,7 +81,6 @@ def display_voice_options(voices_dict):
         for voice in voice_list:
             # Add region indicator (GB/US) to the display
             region = "GB" if "en-GB" in voice.language_codes else "US"
-            gender = voice.ssml_gender.name if hasattr(voice.ssml_gender, 'name') else voice.ssml_gender
             
             # Check SSML support based on voice type
             if "Journey" in voice.name or "Neural2" in voice.name:
@@ -42,7 +90,7 @@ def display_voice_options(voices_dict):
             else:
                 ssml_support = "✗ No SSML"
                 
-            print(f"{current_index}. {voice.name} ({region}, {gender}) [{ssml_support}]")
+            print(f"{current_index}. {voice.name} ({region}, {voice.ssml_gender}) [{ssml_support}]")
             voice_map[current_index] = voice
             current_index += 1
     
@@ -64,7 +112,7 @@ def show_ssml_examples():
     print('<speak>Normal speech, <break time="0.5s"/><prosody rate="slow" pitch="low">then slow and low</prosody></speak>')
 
 def generate_speech(voice, text):
-    client = texttospeech.TextToSpeechClient()
+    client = get_tts_client()
     
     # Check if the input is SSML (starts with <speak>)
     is_ssml = text.strip().startswith('<speak>')
@@ -90,7 +138,7 @@ def generate_speech(voice, text):
         audio_config=audio_config
     )
     
-    output_file = os.path.join(os.path.dirname(__file__), f"tts_output_{voice.name}.mp3")
+    output_file = os.path.join(SCRIPT_DIR, f"tts_output_{voice.name}.mp3")
     with open(output_file, "wb") as out:
         out.write(response.audio_content)
         print(f'\nAudio content written to "{output_file}"')
@@ -1,7 +1,14 @@
 import openai
 import os
+import re
 from pathlib import Path
 
+# Audio is written next to this script
+OUTPUT_DIR = Path(os.path.dirname(__file__))
+
+# SSML tags stripped from file input, removed in a single scan since OpenAI doesn't support them
+SSML_TAG_RE = re.compile(r'</?speak>|<break\s+time="[^"]*"\s*/>|<prosody[^>]*>|</prosody>')
+
 def get_text_input():
     print("\nHow would you like to input text?")
     print("1. Type text directly")
@@ -20,13 +27,7 @@ def get_text_input():
         try:
             with open(file_path, 'r') as file:
                 # Remove SSML tags if present since OpenAI doesn't support them
-                text = file.read().strip()
-                text = text.replace('<speak>', '').replace('</speak>', '')
-                text = text.replace('<break time="1s"/>', '').replace('<break time="1.5s"/>', '')
-                text = text.replace('<break time="2s"/>', '').replace('<break time="3s"/>', '')
-                text = text.replace('<break time="4s"/>', '')
-                text = text.replace('<prosody rate="slow">', '').replace('</prosody>', '')
-                text = text.replace('<prosody rate="medium">', '').replace('</prosody>', '')
+                text = SSML_TAG_RE.sub('', file.read().strip())
                 if not text:
                     raise ValueError("File is empty")
                 return text
@@ -37,9 +38,6 @@ def get_text_input():
 
 def generate_speech_nova(text):
     try:
-        # Create output directory if it doesn't exist
-        output_dir = Path(os.path.dirname(__file__))
-        
         # Generate speech using Nova voice
         response = openai.audio.speech.create(
             model="tts-1",  # or "tts-1-hd" for higher quality
@@ -48,7 +46,7 @@ def generate_speech_nova(text):
         )
         
         # Save the audio file
-        output_file = output_dir / "tts_output_nova.mp3"
+        output_file = OUTPUT_DIR / "tts_output_nova.mp3"
         response.stream_to_file(str(output_file))
         print(f'\nAudio content written to "{output_file}"')
         